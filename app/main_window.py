@@ -1,21 +1,38 @@
 import os
 
 from PyQt6.QtCore import Qt
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, QThreadPool
 from PyQt6.QtWidgets import (QMainWindow, QSplitter, QFrame, QStatusBar, QTabWidget, QVBoxLayout, QFileDialog, QLabel,
-                             QMessageBox)
+                             QMessageBox, QProgressBar, QPushButton)
 from PyQt6.QtGui import QAction, QIcon
-import pandas as pd
 
 from app.tabs.data_tab import DataTab
 from app.tabs.plot_tab import PlotTab
 from app.tabs.regression_tab import RegressionDashboard
 from app.widgets.side_panel import SidePanel, FilterWidget, PlotWidget
+from app.widgets.import_dialog import ImportDialog
 from app.tools.plot_generator import PlotGenerator
 from app.tabs.cleaning_tab import DataCleaningTab
+from app.models.csv_index import build_csv_index
+from app.models.data_view import DataView
+from app.tools.data_cache import DataCache
+from app.tools.data_loader import load_file
+from app.tools.filter_engine import FilterEngine
+from app.tools.plot_cache import PlotCache, params_key
+from app.tools.workers import Worker
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+
+def format_bytes(size):
+    """Human readable file size"""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -24,6 +41,16 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
         self.current_data = None
         self.filtered_data = None
+        self.filter_engine = FilterEngine()
+        self._filter_worker = None
+        self._running_filters = set()
+        # Bumped whenever current_data is replaced, part of every plot cache key
+        self.data_version = 0
+        self.plot_cache = PlotCache()
+        self._plot_worker = None
+        self._running_plots = set()
+        self._load_worker = None
+        self.data_cache = DataCache()
 
         self.init_ui()
         self.create_menu_bar()
@@ -42,6 +69,7 @@ class MainWindow(QMainWindow):
         self.main_tabs = QTabWidget()
         self.data_tab = DataTab()
         self.plot_tab = PlotTab()
+        self.plot_tab.cancel_requested.connect(self.cancel_plotting)
         self.cleaning_tab = DataCleaningTab()
         self.regression_tab = None  # Będzie tworzony przy ładowaniu danych
 
@@ -64,6 +92,19 @@ class MainWindow(QMainWindow):
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
 
+        # Loading progress (shown only while a file is being read)
+        self.rows_label = QLabel()
+        self.load_progress = QProgressBar()
+        self.load_progress.setRange(0, 1000)
+        self.load_progress.setMinimumWidth(350)
+        self.load_progress.hide()
+        self.cancel_load_btn = QPushButton("Cancel")
+        self.cancel_load_btn.clicked.connect(self.cancel_loading)
+        self.cancel_load_btn.hide()
+        self.status_bar.addPermanentWidget(self.load_progress)
+        self.status_bar.addPermanentWidget(self.cancel_load_btn)
+        self.status_bar.addPermanentWidget(self.rows_label)
+
         # Connect signals
         self.side_panel.filter_widget.filters_applied.connect(self.apply_filters)
         self.side_panel.plot_widget.plot_requested.connect(self.generate_plot)
@@ -100,10 +141,22 @@ class MainWindow(QMainWindow):
         open_action.triggered.connect(self.open_file)
         file_menu.addAction(open_action)
 
+        open_large_action = QAction("Open Large File...", self)
+        open_large_action.triggered.connect(self.open_large_file)
+        file_menu.addAction(open_large_action)
+
         save_action = QAction("Save Data Set", self)
         save_action.triggered.connect(self.save_file)
         file_menu.addAction(save_action)
 
+        export_action = QAction("Export Filtered Data", self)
+        export_action.triggered.connect(self.export_filtered)
+        file_menu.addAction(export_action)
+
+        clear_cache_action = QAction("Clear Cache", self)
+        clear_cache_action.triggered.connect(self.clear_cache)
+        file_menu.addAction(clear_cache_action)
+
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -121,18 +174,114 @@ class MainWindow(QMainWindow):
             "CSV Files (*.csv);;Excel Files (*.xlsx *.xls)",
             options=options)
 
-        if file_name:
-            try:
-                if file_name.endswith('.csv'):
-                    self.current_data = pd.read_csv(file_name)
-                else:
-                    self.current_data = pd.read_excel(file_name)
+        if not file_name:
+            return
 
-                if self.current_data is not None:
-                    self.update_ui_with_data()
-                    self.status_bar.addPermanentWidget(QLabel(f"Loaded {len(self.current_data)} rows"))
+        import_options = None
+        if file_name.endswith('.csv'):
+            try:
+                dialog = ImportDialog(file_name, self)
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to load file:\n{str(e)}")
+                return
+            if dialog.exec() != ImportDialog.DialogCode.Accepted:
+                return
+            import_options = dialog.options()
+
+        self.start_loading(file_name, import_options)
+
+    def start_loading(self, file_name, options=None):
+        """Read the file on a worker thread, the UI is updated once it finishes"""
+        worker = Worker(load_file, file_name, options, self.data_cache)
+        self.run_load_worker(worker, file_name, self.on_load_finished)
+
+    def open_large_file(self):
+        """Open a CSV without loading it, the table pages rows in from disk"""
+        file_name, _ = QFileDialog.getOpenFileName(
+            self, "Open Large CSV File", "", "CSV Files (*.csv)",
+            options=QFileDialog.Option.ReadOnly)
+        if file_name:
+            worker = Worker(build_csv_index, file_name)
+            self.run_load_worker(worker, file_name, self.on_index_finished)
+
+    def run_load_worker(self, worker, file_name, on_finished):
+        self.cancel_loading()
+
+        worker.signals.progress.connect(lambda info: self.on_load_progress(worker, info))
+        worker.signals.finished.connect(lambda result: on_finished(worker, file_name, result))
+        worker.signals.failed.connect(lambda message: self.on_load_failed(worker, message))
+        worker.signals.cancelled.connect(lambda: self.on_load_cancelled(worker))
+        self._load_worker = worker
+
+        self.load_progress.setValue(0)
+        self.load_progress.setFormat(f"Loading {os.path.basename(file_name)}...")
+        self.load_progress.show()
+        self.cancel_load_btn.show()
+        QThreadPool.globalInstance().start(worker)
+
+    def cancel_loading(self):
+        if self._load_worker is not None:
+            self._load_worker.cancel()
+
+    def on_load_progress(self, worker, info):
+        if worker is not self._load_worker:
+            return
+        bytes_read, total_bytes, rows = info
+        if total_bytes:
+            self.load_progress.setValue(int(1000 * bytes_read / total_bytes))
+        self.load_progress.setFormat(
+            f"%p% - {format_bytes(bytes_read)} / {format_bytes(total_bytes)}, {rows:,} rows")
+
+    def on_load_finished(self, worker, file_name, data):
+        if worker is not self._load_worker:
+            return
+        self.finish_loading()
+        memory = data.attrs.pop('memory_usage', None)
+        self.current_data = data
+        self.update_ui_with_data()
+        self.rows_label.setText(f"Loaded {len(self.current_data)} rows")
+        if memory is not None:
+            before, after = memory
+            self.status_bar.showMessage(
+                f"Loaded {file_name} - memory {format_bytes(before)} -> {format_bytes(after)}", 10000)
+        else:
+            self.status_bar.showMessage(f"Loaded {file_name}", 3000)
+
+    def on_index_finished(self, worker, file_name, index):
+        if worker is not self._load_worker:
+            return
+        self.finish_loading()
+
+        # Large file mode: only the Data tab is available
+        self.current_data = None
+        self.filtered_data = None
+        self.cancel_filtering()
+        self.filter_engine.reset(None)
+        self.cancel_plotting()
+        self.plot_cache.clear()
+        self.data_tab.show_large_file(index)
+        self.side_panel.update_data(None)
+        self.cleaning_tab.set_data(None)
+        self.remove_regression_tab()
+        self.rows_label.setText(f"Indexed {len(index)} rows (large file mode)")
+        self.status_bar.showMessage(f"Opened {file_name} in large file mode", 3000)
+
+    def on_load_failed(self, worker, message):
+        if worker is not self._load_worker:
+            return
+        self.finish_loading()
+        QMessageBox.critical(self, "Error", f"Failed to load file:\n{message}")
+
+    def on_load_cancelled(self, worker):
+        if worker is not self._load_worker:
+            return
+        self.finish_loading()
+        self.status_bar.showMessage("Loading cancelled", 3000)
+
+    def finish_loading(self):
+        self._load_worker = None
+        self.load_progress.hide()
+        self.cancel_load_btn.hide()
 
     def update_ui_with_data(self):
         """Update all UI elements when new data is loaded"""
@@ -141,57 +290,148 @@ class MainWindow(QMainWindow):
         self.data_tab.update_data(self.current_data)
         self.side_panel.update_data(self.current_data)
         self.cleaning_tab.set_data(self.current_data)
-        self.filtered_data = self.current_data.copy()
+        self.filtered_data = DataView(self.current_data)
+        # New or cleaned data invalidates the cached masks and column indexes
+        self.cancel_filtering()
+        self.filter_engine.reset(self.current_data)
+        self.data_version += 1
+        self.cancel_plotting()
+        self.plot_cache.clear()
+
+        self.remove_regression_tab()
+        self.regression_tab = RegressionDashboard(self.current_data)
+        self.main_tabs.addTab(self.regression_tab, "Regression")
 
+    def remove_regression_tab(self):
         for i in range(self.main_tabs.count()):
             if self.main_tabs.tabText(i) == "Regression":
                 self.main_tabs.removeTab(i)
                 break
-
-        self.regression_tab = RegressionDashboard(self.current_data)
-        self.main_tabs.addTab(self.regression_tab, "Regression")
+        self.regression_tab = None
 
     def apply_filters(self, filters):
         """Apply filters to the data"""
         if self.current_data is None:
             return
 
-        filtered_data = self.current_data.copy()
+        if self.side_panel.filter_widget.is_live():
+            self.apply_filters_async(filters)
+            return
 
-        for column, filter_value in filters.items():
-            if pd.api.types.is_numeric_dtype(self.current_data[column]):
-                min_val, max_val = filter_value
-                if min_val is not None:
-                    filtered_data = filtered_data[filtered_data[column] >= min_val]
-                if max_val is not None:
-                    filtered_data = filtered_data[filtered_data[column] <= max_val]
-            else:
-                if filter_value != "(All)":
-                    filtered_data = filtered_data[filtered_data[column].astype(str) == filter_value]
+        # Filters only build a row mask, the data itself is never copied
+        try:
+            rows = self.filter_engine.apply(filters)
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Invalid filter:\n{str(e)}")
+            return
+        self.show_filtered(rows)
+
+    def apply_filters_async(self, filters):
+        """Evaluate filters on a worker, a newer request cancels the pending one"""
+        self.cancel_filtering()
+
+        engine = self.filter_engine
+        worker = Worker(lambda worker: engine.apply(filters, worker))
+        worker.signals.finished.connect(lambda rows: self.on_filter_finished(worker, rows))
+        worker.signals.failed.connect(lambda message: self.on_filter_failed(worker, message))
+        worker.signals.cancelled.connect(lambda: self._running_filters.discard(worker))
+        # Superseded workers are kept referenced until their thread is done
+        self._running_filters.add(worker)
+        self._filter_worker = worker
+        self.status_bar.showMessage("Filtering...")
+        QThreadPool.globalInstance().start(worker)
+
+    def cancel_filtering(self):
+        if self._filter_worker is not None:
+            self._filter_worker.cancel()
+            self._filter_worker = None
+
+    def on_filter_finished(self, worker, rows):
+        self._running_filters.discard(worker)
+        # Results of superseded requests never reach the table
+        if worker is not self._filter_worker:
+            return
+        self._filter_worker = None
+        self.show_filtered(rows)
+
+    def on_filter_failed(self, worker, message):
+        self._running_filters.discard(worker)
+        if worker is not self._filter_worker:
+            return
+        self._filter_worker = None
+        self.status_bar.showMessage(f"Invalid filter: {message}", 5000)
 
-        self.filtered_data = filtered_data
-        self.data_tab.update_data(filtered_data)
-        self.status_bar.showMessage(f"Filtered data: {len(filtered_data)} rows", 3000)
+    def show_filtered(self, rows):
+        self.filtered_data = DataView(self.current_data, rows)
+        self.data_tab.update_data(self.filtered_data)
+        self.status_bar.showMessage(f"Filtered data: {len(self.filtered_data)} rows", 3000)
 
     def generate_plot(self, plot_params):
-        """Generate plot based on parameters"""
+        """Generate plot based on parameters, on a worker unless it is cached"""
         if self.filtered_data is None or self.filtered_data.empty:
             QMessageBox.warning(self, "Warning", "No data available to plot")
             return
 
-        try:
-            data = self.filtered_data
-            if not isinstance(data, pd.DataFrame):
-                data = pd.DataFrame(data)
-            figure = PlotGenerator.generate(data=data, **plot_params)
+        self.cancel_plotting()
+        cache = self.plot_cache.bind((self.data_version, self.filtered_data.rows_digest()))
+        key = ('figure', params_key(plot_params))
 
-            if figure:
-                self.plot_tab.display_plot(figure)
-            else:
-                QMessageBox.warning(self, "Warning", "Failed to generate plot")
+        # A plot seen before for the same rows is shown without re-rendering
+        figure = cache.get(key)
+        if figure is not None:
+            self.plot_tab.display_plot(figure)
+            return
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to generate plot:\n{str(e)}")
+        view = self.filtered_data
+
+        def render(worker):
+            # Only the columns the plot uses are materialised from the view
+            data = view.to_frame(PlotGenerator.columns_used(**plot_params))
+            figure = PlotGenerator.generate(data=data, cache=cache, worker=worker, raise_errors=True,
+                                            **plot_params)
+            if figure is not None and not worker.is_cancelled():
+                cache.put(key, figure)
+            return figure
+
+        worker = Worker(render)
+        worker.signals.finished.connect(lambda figure: self.on_plot_finished(worker, figure))
+        worker.signals.failed.connect(lambda message: self.on_plot_failed(worker, message))
+        worker.signals.cancelled.connect(lambda: self.on_plot_cancelled(worker))
+        # Superseded workers are kept referenced until their thread is done
+        self._running_plots.add(worker)
+        self._plot_worker = worker
+        self.plot_tab.set_busy(True)
+        QThreadPool.globalInstance().start(worker)
+
+    def cancel_plotting(self):
+        if self._plot_worker is not None:
+            self._plot_worker.cancel()
+            self._plot_worker = None
+            self.plot_tab.set_busy(False)
+
+    def take_plot_worker(self, worker):
+        """Forget a finished worker, True when its result is still wanted"""
+        self._running_plots.discard(worker)
+        if worker is not self._plot_worker:
+            return False
+        self._plot_worker = None
+        self.plot_tab.set_busy(False)
+        return True
+
+    def on_plot_finished(self, worker, figure):
+        if not self.take_plot_worker(worker):
+            return
+        if figure:
+            self.plot_tab.display_plot(figure)
+        else:
+            QMessageBox.warning(self, "Warning", "Failed to generate plot")
+
+    def on_plot_failed(self, worker, message):
+        if self.take_plot_worker(worker):
+            QMessageBox.critical(self, "Error", f"Failed to generate plot:\n{message}")
+
+    def on_plot_cancelled(self, worker):
+        self.take_plot_worker(worker)
 
     def show_about(self):
         QMessageBox.about(self, "About",
@@ -208,6 +448,17 @@ class MainWindow(QMainWindow):
             self.current_data = self.cleaning_tab.df_cleaned.copy()
             self.update_ui_with_data()
 
+    def clear_cache(self):
+        """Remove all cached columnar copies of opened files"""
+        freed = self.data_cache.clear()
+        self.status_bar.showMessage(f"Cache cleared ({format_bytes(freed)} freed)", 3000)
+
+    def closeEvent(self, event):
+        self.cancel_loading()
+        self.cancel_filtering()
+        self.cancel_plotting()
+        super().closeEvent(event)
+
     def save_file(self):
         if self.current_data is None:
             QMessageBox.warning(self, "Warning", "No data to save.")
@@ -223,4 +474,23 @@ class MainWindow(QMainWindow):
                     self.current_data.to_excel(file_name, index=False)
                 self.status_bar.showMessage(f"Data saved to {file_name}", 3000)
             except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to save file:\n{str(e)}")
\ No newline at end of file
+                QMessageBox.critical(self, "Error", f"Failed to save file:\n{str(e)}")
+
+    def export_filtered(self):
+        """Save the rows selected by the current filters"""
+        if self.filtered_data is None:
+            QMessageBox.warning(self, "Warning", "No data to save.")
+            return
+        file_name, selected_filter = QFileDialog.getSaveFileName(
+            self, "Export Filtered Data", "",
+            "CSV Files (*.csv);;Excel Files (*.xlsx *.xls)")
+        if file_name:
+            try:
+                if selected_filter.startswith("CSV") or file_name.endswith('.csv'):
+                    # Written in chunks straight from the view
+                    self.filtered_data.to_csv(file_name)
+                else:
+                    self.filtered_data.to_frame().to_excel(file_name, index=False)
+                self.status_bar.showMessage(f"Filtered data saved to {file_name}", 3000)
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to save file:\n{str(e)}")
@@ -0,0 +1,74 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# Every INDEX_STRIDE-th row start is recorded, so 100M rows need ~100k offsets
+INDEX_STRIDE = 1024
+SCAN_BLOCK = 16 * 1024 * 1024
+
+
+class CsvRowIndex:
+    """Sparse row-offset index of a CSV file for reading arbitrary row windows.
+
+    Rows are assumed to be separated by newlines, quoted fields spanning
+    several lines are not supported.
+    """
+    def __init__(self, file_name, columns, offsets, row_count, stride=INDEX_STRIDE):
+        self.file_name = file_name
+        self.columns = columns
+        self.offsets = offsets
+        self.row_count = row_count
+        self.stride = stride
+
+    def __len__(self):
+        return self.row_count
+
+    def read_rows(self, start, stop) -> pd.DataFrame:
+        """Read rows [start, stop) from disk"""
+        start = max(0, start)
+        stop = min(stop, self.row_count)
+        if start >= stop:
+            return pd.DataFrame(columns=self.columns)
+
+        block = start // self.stride
+        with open(self.file_name, 'rb') as handle:
+            handle.seek(self.offsets[block])
+            # Blank lines are counted as rows by build_csv_index, keep them as empty rows
+            return pd.read_csv(handle, header=None, names=self.columns, skip_blank_lines=False,
+                               skiprows=start - block * self.stride, nrows=stop - start)
+
+
+def build_csv_index(worker, file_name, stride=INDEX_STRIDE):
+    """Scan the file once, recording the byte offset of every stride-th row"""
+    total = os.path.getsize(file_name)
+
+    with open(file_name, 'rb') as handle:
+        header = handle.readline()
+        columns = list(pd.read_csv(io.BytesIO(header), nrows=0).columns)
+
+        position = handle.tell()
+        offsets = [np.array([position], dtype=np.int64)]
+        rows = 0
+        last_byte = b'\n'
+
+        while block := handle.read(SCAN_BLOCK):
+            worker.check_cancelled()
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n'))
+            # Row (rows + k + 1) starts right after the k-th newline of this block
+            first = (-(rows + 1)) % stride
+            offsets.append(position + newlines[first::stride] + 1)
+
+            rows += len(newlines)
+            position += len(block)
+            last_byte = block[-1:]
+            worker.report((position, total, rows))
+
+    # Last line without a trailing newline is still a row
+    if last_byte != b'\n':
+        rows += 1
+
+    offsets = np.concatenate(offsets)
+    offsets = offsets[offsets < total] if rows else offsets[:1]
+    return CsvRowIndex(file_name, columns, offsets, rows, stride)
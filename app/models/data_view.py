@@ -0,0 +1,63 @@
+import hashlib
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+EXPORT_CHUNK_ROWS = 100_000
+
+
+class DataView:
+    """Rows of a DataFrame selected by position, without copying the data.
+
+    rows is an array of row positions into base, None selects every row.
+    """
+    def __init__(self, base: pd.DataFrame, rows: Optional[np.ndarray] = None):
+        self.base = base
+        self.rows = rows
+        self._digest = None
+
+    def __len__(self):
+        return len(self.base) if self.rows is None else len(self.rows)
+
+    def rows_digest(self) -> str:
+        """Hash of the selected row positions, computed once per view"""
+        if self._digest is None:
+            digest = hashlib.blake2b(digest_size=16)
+            if self.rows is None:
+                digest.update(f"all:{len(self.base)}".encode())
+            else:
+                digest.update(np.ascontiguousarray(self.rows).tobytes())
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    @property
+    def columns(self):
+        return self.base.columns
+
+    @property
+    def empty(self):
+        return len(self) == 0 or self.base.shape[1] == 0
+
+    def take(self, start=0, stop=None) -> pd.DataFrame:
+        """Materialise the view rows [start, stop)"""
+        if self.rows is None:
+            return self.base.iloc[start:stop]
+        return self.base.iloc[self.rows[start:stop]]
+
+    def to_frame(self, columns=None) -> pd.DataFrame:
+        """Materialise the view, copying only the requested columns"""
+        base = self.base if columns is None else self.base[list(columns)]
+        if self.rows is None:
+            return base
+        return base.iloc[self.rows]
+
+    def iter_chunks(self, chunk_rows=EXPORT_CHUNK_ROWS):
+        for start in range(0, len(self), chunk_rows):
+            yield self.take(start, start + chunk_rows)
+
+    def to_csv(self, path, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Write the view in row chunks so it is never fully materialised"""
+        self.take(0, 0).to_csv(path, index=False)
+        for chunk in self.iter_chunks(chunk_rows):
+            chunk.to_csv(path, mode='a', header=False, index=False)
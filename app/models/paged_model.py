@@ -0,0 +1,54 @@
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractTableModel, Qt
+
+from app.models.csv_index import CsvRowIndex
+
+PAGE_ROWS = 1000
+MAX_PAGES = 64
+
+
+class PagedCsvModel(QAbstractTableModel):
+    """Table model reading only the row pages the view displays from a CsvRowIndex"""
+    def __init__(self, index: CsvRowIndex):
+        super().__init__()
+        self._index = index
+        self._pages = OrderedDict()
+
+    def rowCount(self, parent=None):
+        return self._index.row_count
+
+    def columnCount(self, parent=None):
+        return len(self._index.columns)
+
+    def page(self, number):
+        """Formatted cell values of one page, kept in a small LRU cache"""
+        if number in self._pages:
+            self._pages.move_to_end(number)
+            return self._pages[number]
+
+        start = number * PAGE_ROWS
+        window = self._index.read_rows(start, start + PAGE_ROWS)
+        values = window.to_numpy(dtype=object).astype(str)
+        self._pages[number] = values
+        if len(self._pages) > MAX_PAGES:
+            self._pages.popitem(last=False)
+        return values
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole:
+            row = index.row()
+            values = self.page(row // PAGE_ROWS)
+            # Pages come up short when the file does not match its index (e.g. multi-line quoted fields)
+            if row % PAGE_ROWS >= len(values):
+                return ""
+            return values[row % PAGE_ROWS, index.column()]
+
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+
+    def headerData(self, section, orientation, role):
+        if role == Qt.ItemDataRole.DisplayRole:
+            if orientation == Qt.Orientation.Horizontal:
+                return str(self._index.columns[section])
+            return str(section)
@@ -1,21 +1,150 @@
-from PyQt6.QtCore import QAbstractTableModel, Qt
+from collections import OrderedDict
+from typing import Optional
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+from PyQt6.QtGui import QGuiApplication
+import numpy as np
 import pandas as pd
 
+# Cells are formatted in blocks of rows, one column at a time
+BLOCK_ROWS = 256
+MAX_CACHED_BLOCKS = 1024
+# Rows handed to the view at a time through fetchMore
+FETCH_ROWS = 20_000
+# Column widths are estimated from this many rows instead of the whole table
+WIDTH_SAMPLE_ROWS = 200
+WIDTH_SAMPLE_CELLS = 20_000
+MAX_COLUMN_WIDTH = 400
+
+
+def column_values(series: pd.Series):
+    """Values of a column as a NumPy array (or ExtensionArray for pandas-only dtypes)"""
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufO':
+        return series.to_numpy()
+    return series.array
+
+
+def resize_columns_to_sample(view, sample_rows=WIDTH_SAMPLE_ROWS):
+    """Fit column widths to the header and the first sample_rows rows only"""
+    model = view.model()
+    if model is None:
+        return
+    header = view.horizontalHeader()
+    header_metrics = header.fontMetrics()
+    metrics = view.fontMetrics()
+    columns = model.columnCount()
+    # Wide tables get fewer sample rows so the total work stays bounded
+    rows = min(sample_rows, model.rowCount(), max(10, WIDTH_SAMPLE_CELLS // max(columns, 1)))
+    padding = 2 * view.style().pixelMetric(view.style().PixelMetric.PM_HeaderMargin) + 12
+
+    for column in range(columns):
+        title = model.headerData(column, Qt.Orientation.Horizontal, Qt.ItemDataRole.DisplayRole) or ""
+        width = header_metrics.horizontalAdvance(title)
+        texts = [model.data(model.index(row, column)) or "" for row in range(rows)]
+        # Only the longest few strings are worth measuring
+        for text in sorted(texts, key=len)[-3:]:
+            width = max(width, metrics.horizontalAdvance(text))
+        header.resizeSection(column, min(width + padding, MAX_COLUMN_WIDTH))
+
+
+def sort_permutation(values):
+    """Stable ascending argsort of a column and its missing value count.
+    Missing values are placed last."""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        # NumPy already sorts NaN to the end
+        missing = int(np.count_nonzero(np.isnan(values))) if values.dtype.kind == 'f' else 0
+        return np.argsort(values, kind='stable'), missing
+
+    try:
+        codes, _ = pd.factorize(values, sort=True)
+    except TypeError:
+        # Mixed types that cannot be compared, order them by their text
+        codes, uniques = pd.factorize(values)
+        text_order = np.argsort(np.array([str(value) for value in uniques]), kind='stable')
+        remap = np.empty(len(uniques), dtype=np.intp)
+        remap[text_order] = np.arange(len(uniques))
+        codes = np.where(codes >= 0, remap[codes], -1)
+    missing = codes < 0
+    codes = np.where(missing, codes.max(initial=-1) + 1, codes)
+    return np.argsort(codes, kind='stable'), int(np.count_nonzero(missing))
+
+
+def dense_ranks(values, permutation, missing):
+    """Dense ranks derived from a sort permutation, missing values rank last"""
+    present = permutation[:len(permutation) - missing]
+    ordered = np.asarray(values[present])
+    starts = np.ones(len(ordered), dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    ranks = np.empty(len(permutation), dtype=np.intp)
+    ranks[present] = np.cumsum(starts) - 1
+    distinct = int(starts.sum())
+    ranks[permutation[len(present):]] = distinct
+    return ranks, distinct
+
+
+def format_values(values) -> list:
+    """Format a block of column values the same way str(value) would"""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        return values.astype(str).tolist()
+    return [str(value) for value in values]
+
+
 class PandasModel(QAbstractTableModel):
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, rows: Optional[np.ndarray] = None):
         super().__init__()
         self._data = data
+        # Row positions of a filtered view, read lazily from the full columns
+        self._rows = rows
+        self._row_total = data.shape[0] if rows is None else len(rows)
+        # Extracted once, data() never goes through DataFrame indexing
+        self._columns = [column_values(data.iloc[:, i]) for i in range(data.shape[1])]
+        self._headers = [str(column) for column in data.columns]
+        self._index = data.index
+        self._blocks = OrderedDict()
+        self._fetched = min(FETCH_ROWS, self._row_total)
+        # View row -> data row permutation, None means unsorted
+        self._order = None
+        self._sort_keys = []
+        # Per column: ascending argsort permutation and dense ranks
+        self._sort_cache = {}
+        self._rank_cache = {}
 
     def rowCount(self, parent=None):
-        return self._data.shape[0]
+        return self._fetched
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return self._fetched < self._row_total
+
+    def fetchMore(self, parent=QModelIndex()):
+        remaining = self._row_total - self._fetched
+        count = min(FETCH_ROWS, remaining)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
 
     def columnCount(self, parent=None):
-        return self._data.shape[1]
+        return len(self._columns)
+
+    def formatted_block(self, column, block):
+        """Formatted strings of one block of a column, kept in an LRU cache"""
+        key = (column, block)
+        if key in self._blocks:
+            self._blocks.move_to_end(key)
+            return self._blocks[key]
+
+        start = block * BLOCK_ROWS
+        values = format_values(self._columns[column][self.positions(start, start + BLOCK_ROWS)])
+        self._blocks[key] = values
+        if len(self._blocks) > MAX_CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return values
 
     def data(self, index, role=Qt.ItemDataRole.DisplayRole):
         if role == Qt.ItemDataRole.DisplayRole:
-            value = self._data.iloc[index.row(), index.column()]
-            return str(value)
+            row = index.row()
+            return self.formatted_block(index.column(), row // BLOCK_ROWS)[row % BLOCK_ROWS]
 
         if role == Qt.ItemDataRole.TextAlignmentRole:
             return Qt.AlignmentFlag.AlignCenter
@@ -23,5 +152,72 @@ class PandasModel(QAbstractTableModel):
     def headerData(self, section, orientation, role):
         if role == Qt.ItemDataRole.DisplayRole:
             if orientation == Qt.Orientation.Horizontal:
-                return str(self._data.columns[section])
-            return str(self._data.index[section])
\ No newline at end of file
+                return self._headers[section]
+            return str(self._index[self.positions(section, section + 1)][0])
+
+    def positions(self, start, stop):
+        """Data row positions (or a slice) of the view rows [start, stop)"""
+        positions = slice(start, stop) if self._order is None else self._order[start:stop]
+        if self._rows is not None:
+            positions = self._rows[positions]
+        return positions
+
+    def view_column(self, column):
+        values = self._columns[column]
+        return values if self._rows is None else values[self._rows]
+
+    def column_sort(self, column):
+        """Cached (permutation, missing) of a column, computed once"""
+        if column not in self._sort_cache:
+            self._sort_cache[column] = sort_permutation(self.view_column(column))
+        return self._sort_cache[column]
+
+    def column_ranks(self, column):
+        """Cached dense (ranks, distinct) of a column, used for multi-column sort"""
+        if column not in self._rank_cache:
+            permutation, missing = self.column_sort(column)
+            self._rank_cache[column] = dense_ranks(self.view_column(column), permutation, missing)
+        return self._rank_cache[column]
+
+    def sort_order(self, column, ascending):
+        """Row permutation for one column, descending reuses the ascending one"""
+        permutation, missing = self.column_sort(column)
+        if ascending:
+            return permutation
+        present = len(permutation) - missing
+        # Missing values stay at the end in both directions
+        return np.concatenate([permutation[:present][::-1], permutation[present:]])
+
+    def multi_sort_order(self, keys):
+        """Row permutation for several (column, ascending) keys, first key is primary"""
+        rank_keys = []
+        for column, ascending in reversed(keys):
+            ranks, distinct = self.column_ranks(column)
+            if not ascending:
+                ranks = np.where(ranks < distinct, distinct - 1 - ranks, ranks)
+            rank_keys.append(ranks)
+        return np.lexsort(rank_keys)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Sort the view without touching the DataFrame. Shift+click adds a secondary key"""
+        self.layoutAboutToBeChanged.emit()
+
+        if column < 0:
+            self._sort_keys = []
+        else:
+            ascending = order == Qt.SortOrder.AscendingOrder
+            keys = [key for key in self._sort_keys if key[0] != column]
+            if QGuiApplication.keyboardModifiers() & Qt.KeyboardModifier.ShiftModifier and keys:
+                self._sort_keys = keys + [(column, ascending)]
+            else:
+                self._sort_keys = [(column, ascending)]
+
+        if not self._sort_keys:
+            self._order = None
+        elif len(self._sort_keys) == 1:
+            self._order = self.sort_order(*self._sort_keys[0])
+        else:
+            self._order = self.multi_sort_order(self._sort_keys)
+
+        self._blocks.clear()
+        self.layoutChanged.emit()
@@ -5,7 +5,7 @@ from PyQt6.QtWidgets import (
     QDoubleSpinBox, QTableWidget, QSplitter, QFormLayout
 )
 from PyQt6.QtCore import Qt, pyqtSignal
-from app.models.pandas_model import PandasModel
+from app.models.pandas_model import PandasModel, resize_columns_to_sample
 import pandas as pd
 import numpy as np
 
@@ -196,6 +196,11 @@ class DataCleaningTab(QWidget):
 
     def set_data(self, df: pd.DataFrame):
         """Set the data to be cleaned"""
+        if df is None:
+            self.df_original = None
+            self.df_cleaned = None
+            self.table_view.setModel(None)
+            return
         self.df_original = df.copy()
         self.df_cleaned = df.copy()
         self.update_ui()
@@ -213,7 +218,7 @@ class DataCleaningTab(QWidget):
         if self.df_cleaned is not None:
             model = PandasModel(self.df_cleaned)
             self.table_view.setModel(model)
-            self.table_view.resizeColumnsToContents()
+            resize_columns_to_sample(self.table_view)
 
     def update_missing_values_panel(self):
         """Update missing values panel with current data"""
@@ -1,7 +1,9 @@
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTableView, QLabel
 from PyQt6.QtCore import Qt
 
-from app.models.pandas_model import PandasModel
+from app.models.data_view import DataView
+from app.models.pandas_model import PandasModel, resize_columns_to_sample
+from app.models.paged_model import PagedCsvModel
 
 
 class DataTab(QWidget):
@@ -16,6 +18,8 @@ class DataTab(QWidget):
         self.data_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectItems)
         self.data_table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
         self.data_table.setAlternatingRowColors(True)
+        self.data_table.horizontalHeader().setSortIndicatorClearable(True)
+        self.data_table.setSortingEnabled(True)
         self.data_table.hide()
 
         self.no_data_label = QLabel("No imported data set")
@@ -25,14 +29,27 @@ class DataTab(QWidget):
         layout.addWidget(self.no_data_label)
 
     def update_data(self, data):
-        """Update the data displayed in the table"""
+        """Update the data displayed in the table (a DataFrame or a DataView)"""
         if data is not None:
             self.no_data_label.hide()
             self.data_table.show()
 
-            model = PandasModel(data)
+            if isinstance(data, DataView):
+                model = PandasModel(data.base, data.rows)
+            else:
+                model = PandasModel(data)
+            # New data starts unsorted
+            self.data_table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
             self.data_table.setModel(model)
-            self.data_table.resizeColumnsToContents()
+            resize_columns_to_sample(self.data_table)
         else:
             self.no_data_label.show()
-            self.data_table.hide()
\ No newline at end of file
+            self.data_table.hide()
+
+    def show_large_file(self, index):
+        """Show a CsvRowIndex, rows are read from disk as they are scrolled into view"""
+        self.no_data_label.hide()
+        self.data_table.show()
+        self.data_table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.data_table.setModel(PagedCsvModel(index))
+        resize_columns_to_sample(self.data_table)
\ No newline at end of file
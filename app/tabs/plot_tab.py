@@ -1,13 +1,27 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QFileDialog, QHBoxLayout
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QPushButton, QFileDialog, QHBoxLayout, QProgressBar, QLabel
+from PyQt6.QtCore import QThreadPool, QTimer, pyqtSignal
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
+import matplotlib.pyplot as plt
+
+from app.tools.workers import Worker
+
+# Decimated layers are re-sampled once zooming or panning pauses this long
+RESAMPLE_DELAY_MS = 200
 
 
 class PlotTab(QWidget):
+    cancel_requested = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.current_figure = None
+        self._lod_layers = []
+        # Limits of the last re-sample, unchanged limits are not re-sampled again
+        self._resampled_limits = None
+        self._resample_worker = None
+        self._running_resamples = set()
         self.init_ui()
 
     def init_ui(self):
@@ -27,92 +41,110 @@ class PlotTab(QWidget):
 
         self.button_layout.addWidget(self.clear_button)
 
+        # Shown while a plot is generated on a worker
+        self.busy_label = QLabel("Generating plot...")
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setRange(0, 0)
+        self.busy_bar.setMaximumWidth(200)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_requested)
+        for widget in (self.busy_label, self.busy_bar, self.cancel_button):
+            self.button_layout.addWidget(widget)
+            widget.hide()
+        self.button_layout.addStretch()
+
         self.layout.addWidget(self.toolbar)
         self.layout.addWidget(self.canvas)
         self.layout.addLayout(self.button_layout)
 
-    def display_plot(self, figure):
-        """Display a new plot in the tab"""
-        # Clear current figure
-        self.figure.clear()
-        self.canvas.draw()
-        self.current_figure = None
-        self.current_figure = figure
+        self.resample_timer = QTimer(self)
+        self.resample_timer.setSingleShot(True)
+        self.resample_timer.setInterval(RESAMPLE_DELAY_MS)
+        self.resample_timer.timeout.connect(self.resample)
 
-        # If figure is a FacetGrid or similar
-        if hasattr(figure, 'axes'):
-            # For FacetGrid and similar multi-plot figures
-            for i, ax in enumerate(figure.axes):
-                new_ax = self.figure.add_subplot(figure.axes[i].get_subplotspec())
-
-                # Copy all plot elements
-                for artist in ax.get_children():
-                    if hasattr(artist, 'get_xdata'):
-                        # Line plots
-                        new_ax.plot(artist.get_xdata(), artist.get_ydata(),
-                                    color=artist.get_color(),
-                                    linestyle=artist.get_linestyle())
-                    elif hasattr(artist, 'get_offsets'):
-                        # Scatter plots
-                        new_ax.scatter(artist.get_offsets()[:, 0],
-                                       artist.get_offsets()[:, 1],
-                                       color=artist.get_facecolor())
-                    elif hasattr(artist, 'get_paths'):
-                        # Bar plots, box plots, etc.
-                        for path in artist.get_paths():
-                            new_ax.add_patch(artist.__class__(path))
-
-                # Copy axis properties
-                new_ax.set_title(ax.get_title())
-                new_ax.set_xlabel(ax.get_xlabel())
-                new_ax.set_ylabel(ax.get_ylabel())
-
-                # Copy legend if exists
-                if ax.get_legend():
-                    handles, labels = ax.get_legend_handles_labels()
-                    new_ax.legend(handles, labels, title=ax.get_legend().get_title().get_text())
-        else:
-            # For single plots
-            if len(figure.axes) > 0:
-                ax = figure.axes[0]
-                new_ax = self.figure.add_subplot(111)
-
-                # Copy all plot elements
-                for artist in ax.get_children():
-                    if hasattr(artist, 'get_xdata'):
-                        # Line plots
-                        new_ax.plot(artist.get_xdata(), artist.get_ydata(),
-                                    color=artist.get_color(),
-                                    linestyle=artist.get_linestyle())
-                    elif hasattr(artist, 'get_offsets'):
-                        # Scatter plots
-                        new_ax.scatter(artist.get_offsets()[:, 0],
-                                       artist.get_offsets()[:, 1],
-                                       color=artist.get_facecolor())
-                    elif hasattr(artist, 'get_paths'):
-                        # Bar plots, box plots, etc.
-                        for path in artist.get_paths():
-                            new_ax.add_patch(artist.__class__(path))
-
-                # Copy axis properties
-                new_ax.set_title(ax.get_title())
-                new_ax.set_xlabel(ax.get_xlabel())
-                new_ax.set_ylabel(ax.get_ylabel())
-                new_ax.set_xticks(ax.get_xticks())
-                new_ax.set_yticks(ax.get_yticks())
-                new_ax.set_xticklabels(ax.get_xticklabels())
-                new_ax.set_yticklabels(ax.get_yticklabels())
-
-                # Copy legend if exists
-                if ax.get_legend():
-                    handles, labels = ax.get_legend_handles_labels()
-                    new_ax.legend(handles, labels, title=ax.get_legend().get_title().get_text())
-
-        self.canvas.draw()
+    def set_busy(self, busy):
+        for widget in (self.busy_label, self.busy_bar, self.cancel_button):
+            widget.setVisible(busy)
 
+    def display_plot(self, figure):
+        """Display a new plot in the tab, adopting the generated figure as is"""
+        # FacetGrid figures are created through pyplot, release them from its registry
+        plt.close(figure)
+        self.set_figure(figure)
+        self.current_figure = figure
+        self.watch_lod_layers(getattr(figure, 'lod_layers', []))
+        self.canvas.draw_idle()
+
+    def watch_lod_layers(self, layers):
+        """Re-sample decimated layers from the full data when their axes limits change"""
+        self.cancel_resample()
+        self._lod_layers = layers
+        self._resampled_limits = [layer.limits() for layer in layers]
+        for ax in {layer.artist.axes for layer in layers}:
+            ax.callbacks.connect('xlim_changed', self.on_limits_changed)
+            ax.callbacks.connect('ylim_changed', self.on_limits_changed)
+
+    def on_limits_changed(self, ax):
+        if any(layer.artist.axes is ax for layer in self._lod_layers):
+            self.resample_timer.start()
+
+    def resample(self):
+        """Compute the visible windows of all layers on a worker, newer requests win"""
+        self.cancel_resample()
+        if not self._lod_layers:
+            return
+        requests = [(layer, layer.limits()) for layer in self._lod_layers]
+        limits = [limits for _, limits in requests]
+        if limits == self._resampled_limits:
+            return
+        self._resampled_limits = limits
+
+        def task(worker):
+            windows = []
+            for layer, limits in requests:
+                worker.check_cancelled()
+                windows.append((layer, layer.window(*limits)))
+            return windows
+
+        worker = Worker(task)
+        worker.signals.finished.connect(lambda windows: self.on_resampled(worker, windows))
+        worker.signals.failed.connect(lambda message: self._running_resamples.discard(worker))
+        worker.signals.cancelled.connect(lambda: self._running_resamples.discard(worker))
+        # Superseded workers are kept referenced until their thread is done
+        self._running_resamples.add(worker)
+        self._resample_worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def on_resampled(self, worker, windows):
+        self._running_resamples.discard(worker)
+        if worker is not self._resample_worker:
+            return
+        self._resample_worker = None
+        # Only the decimated artists change, the rest of the figure is untouched
+        for layer, window in windows:
+            layer.update(window)
+        self.canvas.draw_idle()
+
+    def cancel_resample(self):
+        self.resample_timer.stop()
+        if self._resample_worker is not None:
+            self._resample_worker.cancel()
+            self._resample_worker = None
+
+    def set_figure(self, figure):
+        """Replace the canvas and toolbar with new ones drawing figure"""
+        canvas = FigureCanvas(figure)
+        toolbar = NavigationToolbar(canvas, self)
+        self.layout.replaceWidget(self.toolbar, toolbar)
+        self.layout.replaceWidget(self.canvas, canvas)
+        for widget in (self.toolbar, self.canvas):
+            widget.setParent(None)
+            widget.deleteLater()
+        self.figure, self.canvas, self.toolbar = figure, canvas, toolbar
 
     def clear_plot(self):
         """Clear the current plot"""
-        self.figure.clear()
-        self.canvas.draw()
-        self.current_figure = None
\ No newline at end of file
+        self.watch_lod_layers([])
+        self.set_figure(Figure())
+        self.canvas.draw_idle()
+        self.current_figure = None
@@ -0,0 +1,158 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Aggregations derived from the per-group statistics of group_stats()
+STAT_AGGREGATIONS = ('mean', 'sum', 'count', 'min', 'max', 'std', 'var')
+# Two-sided 95% normal quantile for analytic confidence intervals
+Z_95 = 1.959964
+# Largest heatmap grid pivot_grid builds
+MAX_GRID_CELLS = 4_000_000
+# Frames longer than this are aggregated in row partitions on a thread pool
+PARTITION_ROWS = 1_000_000
+MAX_WORKERS = os.cpu_count() or 1
+
+
+def map_partitions(fn, n, workers=None, partition_rows=PARTITION_ROWS) -> list:
+    """fn(start, stop) for every row partition of n rows, run on a thread pool.
+
+    pandas groupby kernels and NumPy release the GIL, so partitions are
+    aggregated in parallel. Small inputs or a single worker run inline.
+    """
+    workers = workers or MAX_WORKERS
+    starts = range(0, max(n, 1), partition_rows)
+    if workers == 1 or len(starts) == 1:
+        return [fn(start, min(start + partition_rows, n)) for start in starts]
+    with ThreadPoolExecutor(min(workers, len(starts))) as pool:
+        return list(pool.map(lambda start: fn(start, min(start + partition_rows, n)), starts))
+
+
+def partial_stats(data: pd.DataFrame, keys, y) -> pd.DataFrame:
+    """count, sum, min, max and sum of squared deviations (m2) of y per group of keys"""
+    stats = data.groupby(list(keys), observed=True, sort=False)[y].agg(['count', 'sum', 'var', 'min', 'max'])
+    stats['m2'] = stats.pop('var').fillna(0) * (stats['count'] - 1).clip(lower=0)
+    return stats
+
+
+def combine_stats(parts) -> pd.DataFrame:
+    """Merge partial_stats of row partitions, variances are combined with Chan's formula"""
+    stats = pd.concat(parts)
+    levels = list(range(stats.index.nlevels))
+    grouped = stats.groupby(level=levels, sort=True)
+    combined = grouped[['count', 'sum']].sum()
+    combined['mean'] = combined['sum'] / combined['count']
+    # Each partition's m2 is taken about its own mean, shift it to the combined mean
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shift = stats['sum'] / stats['count'] - combined['mean'].reindex(stats.index).to_numpy()
+    spread = (stats['count'] * shift ** 2).fillna(0)
+    m2 = grouped['m2'].sum() + spread.groupby(level=levels, sort=True).sum()
+    combined['var'] = m2 / (combined['count'] - 1)
+    combined.loc[combined['count'] < 2, 'var'] = np.nan
+    combined['min'] = grouped['min'].min()
+    combined['max'] = grouped['max'].max()
+    return combined
+
+
+def group_stats(data: pd.DataFrame, keys, y, workers=None) -> pd.DataFrame:
+    """count, sum, mean, var, min and max of y for every group of keys.
+    Large frames are aggregated per row partition in parallel and merged."""
+    parts = map_partitions(lambda start, stop: partial_stats(data.iloc[start:stop], keys, y),
+                           len(data), workers)
+    return combine_stats(parts)
+
+
+def aggregate(data: pd.DataFrame, keys, y, aggregation, workers=None) -> pd.DataFrame:
+    """One row per group of keys with the aggregated y, like groupby(keys)[y].agg().reset_index()"""
+    keys = list(keys)
+    if aggregation in STAT_AGGREGATIONS and pd.api.types.is_numeric_dtype(data[y]) \
+            and not pd.api.types.is_bool_dtype(data[y]):
+        values = summarize(group_stats(data, keys, y, workers), aggregation)['value']
+        return values.rename(y).reset_index()
+    return data.groupby(keys, observed=True)[y].agg(aggregation).reset_index()
+
+
+def summarize(stats: pd.DataFrame, aggregation='mean') -> pd.DataFrame:
+    """Aggregate value and 95% error margin of every group from its statistics.
+
+    Errors are analytic (normal approximation) for mean and sum, NaN otherwise.
+    """
+    aggregation = aggregation or 'mean'
+    if aggregation == 'std':
+        value = np.sqrt(stats['var'])
+    else:
+        value = stats[aggregation]
+    sem = np.sqrt(stats['var'] / stats['count'])
+    if aggregation == 'mean':
+        error = Z_95 * sem
+    elif aggregation == 'sum':
+        error = Z_95 * sem * stats['count']
+    else:
+        error = pd.Series(np.nan, index=stats.index)
+    return pd.DataFrame({'value': value, 'error': error, 'count': stats['count']})
+
+
+def pivot_grid(data: pd.DataFrame, index, columns, value=None, aggregation=None):
+    """Aggregate value over every (index, columns) pair as a dense grid.
+
+    Both keys are factorized to integer codes, the cells are filled with
+    bincount over row partitions in parallel, no per-group Python work is done. Without a value column
+    the grid holds row counts. Returns (grid, index labels, column labels),
+    cells without rows are NaN.
+    """
+    aggregation = aggregation or ('mean' if value else 'count')
+    row_codes, row_labels = pd.factorize(data[index], sort=True)
+    column_codes, column_labels = pd.factorize(data[columns], sort=True)
+    shape = (len(row_labels), len(column_labels))
+    if shape[0] * shape[1] > MAX_GRID_CELLS:
+        raise ValueError(f"Heatmap would have {shape[0] * shape[1]:,} cells, "
+                         f"more than {MAX_GRID_CELLS:,}")
+
+    present = (row_codes >= 0) & (column_codes >= 0)
+    if value:
+        values = data[value].to_numpy(dtype='float64', na_value=np.nan)
+        present &= ~np.isnan(values)
+        values = values[present]
+    cells = row_codes[present] * shape[1] + column_codes[present]
+    size = shape[0] * shape[1]
+
+    def bincount(weights=None):
+        """Per-cell bincount, summed over row partitions counted in parallel"""
+        parts = map_partitions(lambda start, stop: np.bincount(
+            cells[start:stop], None if weights is None else weights[start:stop], minlength=size), len(cells))
+        return np.sum(parts, axis=0)
+
+    counts = bincount().astype('float64')
+
+    if aggregation not in STAT_AGGREGATIONS:
+        # Anything else (median, nunique, ...) goes through pandas on the codes
+        grouped = pd.Series(values if value else np.ones(len(cells))).groupby(cells).agg(aggregation)
+        grid = np.full(size, np.nan)
+        grid[grouped.index.to_numpy()] = grouped.to_numpy()
+    elif aggregation == 'count' or not value:
+        grid = counts
+    elif aggregation in ('min', 'max'):
+        reduce = np.minimum if aggregation == 'min' else np.maximum
+
+        def extreme(start, stop):
+            grid = np.full(size, np.inf if aggregation == 'min' else -np.inf)
+            reduce.at(grid, cells[start:stop], values[start:stop])
+            return grid
+        grid = reduce.reduce(map_partitions(extreme, len(cells)), axis=0)
+    else:
+        sums = bincount(values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+            if aggregation == 'sum':
+                grid = sums
+            elif aggregation == 'mean':
+                grid = means
+            else:
+                squares = bincount(values * values)
+                grid = np.maximum(squares - sums * means, 0) / (counts - 1)
+                if aggregation == 'std':
+                    grid = np.sqrt(grid)
+
+    grid = np.where(counts > 0, grid, np.nan) if aggregation != 'count' else grid
+    return grid.reshape(shape), list(row_labels), list(column_labels)
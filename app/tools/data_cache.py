@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+
+from pyarrow import feather
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "data_shovel")
+MAX_CACHE_BYTES = 4 * 1024 ** 3
+CACHE_FORMAT = "feather-v1"
+HASH_BLOCK = 8 * 1024 * 1024
+
+
+class DataCache:
+    """Content-hash keyed cache of loaded data sets stored as Feather (Arrow IPC) files.
+
+    Files are written uncompressed so they can be memory-mapped on load.
+    The least recently used files are evicted once the cache grows above max_bytes.
+    """
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def file_key(self, file_name, options=None, worker=None):
+        """Hash of the file contents and the options used to parse it"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(CACHE_FORMAT.encode())
+        digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode())
+
+        total = os.path.getsize(file_name)
+        hashed = 0
+        with open(file_name, 'rb') as handle:
+            while block := handle.read(HASH_BLOCK):
+                digest.update(block)
+                hashed += len(block)
+                if worker is not None:
+                    worker.check_cancelled()
+                    worker.report((hashed, total, 0))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.feather")
+
+    def load(self, key, types_mapper=None):
+        """Return the cached DataFrame or None on a miss"""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            data = feather.read_table(path, memory_map=True).to_pandas(types_mapper=types_mapper)
+        except Exception:
+            # Unreadable cache files are dropped, the data set is loaded from source
+            self.remove(path)
+            return None
+        # Mark as recently used for LRU eviction
+        os.utime(path)
+        return data
+
+    def store(self, key, data):
+        """Write data to the cache, silently skipping frames Arrow cannot represent"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            feather.write_feather(data, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+        except Exception:
+            # Caching is best effort, the data set is simply not cached
+            self.remove(tmp_path)
+            return
+        self.evict()
+
+    def entries(self):
+        """(path, size, mtime) of all cache files, oldest first"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.feather'):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda item: item[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Remove least recently used files until the cache fits in max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+
+    def clear(self):
+        """Remove all cache files and return the number of bytes freed"""
+        freed = 0
+        for path, size, _ in self.entries():
+            self.remove(path)
+            freed += size
+        return freed
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,195 @@
+import os
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+from app.tools.dtype_optimizer import memory_usage, optimize_dtypes
+
+CHUNK_ROWS = 200_000
+ARROW_BLOCK_SIZE = 16 * 1024 * 1024
+
+# Column type choices offered in the import dialog
+PANDAS_DTYPES = {
+    "int": "Int64",
+    "float": "float64",
+    "text": "string",
+    "category": "category",
+    "bool": "boolean",
+}
+ARROW_DTYPES = {
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "text": pa.string(),
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "bool": pa.bool_(),
+    "datetime": pa.timestamp("ns"),
+}
+DTYPE_CHOICES = ["auto"] + list(ARROW_DTYPES)
+
+
+def default_options():
+    return {
+        'engine': 'pandas',
+        'arrow_dtypes': False,
+        'usecols': None,
+        'dtypes': {},
+        'optimize_dtypes': False,
+    }
+
+
+def load_file(worker, file_name, options=None, cache=None):
+    """Load a CSV or Excel file, reporting (bytes_read, total_bytes, rows).
+
+    With a DataCache, an unchanged file parsed with the same options is
+    read back from its columnar copy instead of being parsed again.
+    """
+    options = {**default_options(), **(options or {})}
+
+    if cache is None:
+        return prepare_data(worker, file_name, options)
+
+    key = cache.file_key(file_name, options, worker)
+    data = cache.load(key, types_mapper=pd.ArrowDtype if options['arrow_dtypes'] else None)
+    if data is not None:
+        total = os.path.getsize(file_name)
+        worker.report((total, total, len(data)))
+        return data
+
+    data = prepare_data(worker, file_name, options)
+    worker.check_cancelled()
+    cache.store(key, data)
+    return data
+
+
+def prepare_data(worker, file_name, options):
+    """Parse the file and apply the optional dtype optimisation pass"""
+    data = parse_file(worker, file_name, options)
+    if options['optimize_dtypes']:
+        worker.check_cancelled()
+        before = memory_usage(data)
+        data = optimize_dtypes(data)
+        # Picked up by MainWindow to report the savings
+        data.attrs['memory_usage'] = (before, memory_usage(data))
+    return data
+
+
+def parse_file(worker, file_name, options):
+    if file_name.endswith('.csv'):
+        if options['engine'] == 'pyarrow':
+            return read_csv_arrow(worker, file_name, options)
+        return read_csv_chunked(worker, file_name, options)
+
+    # Excel files cannot be streamed, they are read in one go
+    total = os.path.getsize(file_name)
+    data = pd.read_excel(file_name)
+    worker.check_cancelled()
+    worker.report((total, total, len(data)))
+    return data
+
+
+def pandas_read_kwargs(options):
+    """Translate import options into pd.read_csv keyword arguments"""
+    kwargs = {}
+    if options['usecols'] is not None:
+        kwargs['usecols'] = options['usecols']
+
+    dtypes = {col: PANDAS_DTYPES[kind] for col, kind in options['dtypes'].items() if kind in PANDAS_DTYPES}
+    if dtypes:
+        kwargs['dtype'] = dtypes
+    dates = [col for col, kind in options['dtypes'].items() if kind == 'datetime']
+    if dates:
+        kwargs['parse_dates'] = dates
+
+    if options['arrow_dtypes']:
+        kwargs['dtype_backend'] = 'pyarrow'
+    return kwargs
+
+
+def read_csv_chunked(worker, file_name, options=None, chunksize=CHUNK_ROWS):
+    """Read a CSV in row chunks so the load can be cancelled and tracked"""
+    options = {**default_options(), **(options or {})}
+    kwargs = pandas_read_kwargs(options)
+    total = os.path.getsize(file_name)
+    chunks = []
+    rows = 0
+
+    with open(file_name, 'rb') as handle:
+        with pd.read_csv(handle, chunksize=chunksize, **kwargs) as reader:
+            for chunk in reader:
+                worker.check_cancelled()
+                chunks.append(chunk)
+                rows += len(chunk)
+                worker.report((handle.tell(), total, rows))
+
+    if not chunks:
+        # Header-only file, read_csv yields no chunks
+        return pd.read_csv(file_name, **kwargs)
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(unify_categories(chunks), ignore_index=True)
+
+
+def unify_categories(chunks):
+    """Give categorical columns the same categories in every chunk.
+    pd.concat turns categoricals with differing categories into plain strings."""
+    for column, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = union_categoricals([chunk[column] for chunk in chunks]).categories
+            for chunk in chunks:
+                chunk[column] = chunk[column].cat.set_categories(categories)
+    return chunks
+
+
+class ProgressFile:
+    """File wrapper used by the Arrow reader to track progress and cancel"""
+    def __init__(self, handle, worker, total):
+        self.handle = handle
+        self.worker = worker
+        self.total = total
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        # Raising here aborts pa_csv.read_csv, the exception is propagated
+        self.worker.check_cancelled()
+        block = self.handle.read(size)
+        self.bytes_read += len(block)
+        self.worker.report((self.bytes_read, self.total, 0))
+        return block
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        self.handle.close()
+
+    @property
+    def closed(self):
+        return self.handle.closed
+
+
+def read_csv_arrow(worker, file_name, options):
+    """Parse a CSV with pyarrow's multithreaded reader"""
+    total = os.path.getsize(file_name)
+    read_options = pa_csv.ReadOptions(use_threads=True, block_size=ARROW_BLOCK_SIZE)
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=options['usecols'],
+        column_types={col: ARROW_DTYPES[kind] for col, kind in options['dtypes'].items()
+                      if kind in ARROW_DTYPES},
+    )
+
+    with open(file_name, 'rb') as handle:
+        table = pa_csv.read_csv(ProgressFile(handle, worker, total),
+                                read_options=read_options, convert_options=convert_options)
+    worker.check_cancelled()
+
+    if options['arrow_dtypes']:
+        data = table.to_pandas(types_mapper=pd.ArrowDtype)
+    else:
+        data = table.to_pandas()
+    worker.report((total, total, len(data)))
+    return data
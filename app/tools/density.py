@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+# Values are counted once on this fine grid, KDEs of any bandwidth are derived from it
+FINE_BINS = 4096
+HIST_BINS = 50
+# The KDE extends this many bandwidths past the data, as seaborn's cut=3
+KDE_CUT = 3
+
+
+class BinnedColumn:
+    """Counts of a numeric column on a fine grid, one row per hue level.
+
+    Built once from the data, then reused for any bin count or bandwidth.
+    The values are also kept sorted per level so histograms are binned
+    exactly.
+    """
+    def __init__(self, values: np.ndarray, codes=None, levels=(None,), fine_bins=FINE_BINS):
+        valid = ~np.isnan(values)
+        values = values[valid]
+        codes = np.zeros(len(values), dtype=np.intp) if codes is None else codes[valid]
+        self.levels = list(levels)
+        self.fine_bins = fine_bins
+        self.lo = float(values.min()) if len(values) else 0.0
+        self.hi = float(values.max()) if len(values) else 1.0
+        if self.hi <= self.lo:
+            self.hi = self.lo + 1.0
+
+        index = np.minimum(((values - self.lo) * (fine_bins / (self.hi - self.lo))).astype(np.intp),
+                           fine_bins - 1)
+        levels_count = len(self.levels)
+        self.counts = np.bincount(codes * fine_bins + index,
+                                  minlength=levels_count * fine_bins).reshape(levels_count, fine_bins)
+        self.n = np.bincount(codes, minlength=levels_count)
+        sums = np.bincount(codes, weights=values, minlength=levels_count)
+        squares = np.bincount(codes, weights=values * values, minlength=levels_count)
+        means = sums / np.maximum(self.n, 1)
+        self.std = np.sqrt(np.maximum(squares / np.maximum(self.n, 1) - means * means, 0))
+
+        # Values grouped by level, each level sorted, its rows at starts[i]:starts[i + 1]
+        self.sorted_values = values[np.argsort(codes, kind='stable')] if levels_count > 1 else values.copy()
+        self.starts = np.concatenate([[0], np.cumsum(self.n)])
+        for start, stop in zip(self.starts[:-1], self.starts[1:]):
+            self.sorted_values[start:stop].sort()
+
+    @property
+    def step(self):
+        return (self.hi - self.lo) / self.fine_bins
+
+    @property
+    def nbytes(self):
+        return self.counts.nbytes + self.sorted_values.nbytes
+
+    def histogram(self, bins=HIST_BINS):
+        """(counts per level, edges) of bins equally wide bins, as np.histogram counts them"""
+        edges = np.linspace(self.lo, self.hi, max(1, bins) + 1)
+        counts = np.empty((len(self.levels), len(edges) - 1), dtype=np.intp)
+        for i, (start, stop) in enumerate(zip(self.starts[:-1], self.starts[1:])):
+            positions = np.searchsorted(self.sorted_values[start:stop], edges, side='left')
+            # The last bin also holds values equal to the upper edge
+            positions[-1] = stop - start
+            counts[i] = np.diff(positions)
+        return counts, edges
+
+    def kde(self, bw_adjust=1.0):
+        """(densities per level, grid) of a Gaussian KDE by FFT convolution of the fine counts.
+
+        Each level gets its own Scott's rule bandwidth, like scipy.stats.gaussian_kde
+        per hue level in seaborn. Densities share one normalisation, so each level
+        integrates to its share of rows.
+        """
+        total = max(int(self.n.sum()), 1)
+        n = np.maximum(self.n, 1)
+        # Sample standard deviation, constant levels fall back to one fine bin
+        std = self.std * np.sqrt(n / np.maximum(n - 1, 1))
+        std = np.where(std > 0, std, self.step)
+        bandwidths = bw_adjust * std * n ** (-1 / 5)
+
+        radius = int(np.ceil(KDE_CUT * bandwidths.max() / self.step))
+        offsets = np.arange(-radius, radius + 1) * self.step
+        kernels = np.exp(-0.5 * (offsets / bandwidths[:, None]) ** 2)
+        kernels /= kernels.sum(axis=1, keepdims=True)
+
+        size = self.fine_bins + 2 * radius
+        length = 1 << int(np.ceil(np.log2(size + kernels.shape[1])))
+        spectra = np.fft.rfft(kernels, length, axis=1)
+        densities = np.fft.irfft(np.fft.rfft(self.counts, length, axis=1) * spectra, length, axis=1)[:, :size]
+        densities = np.maximum(densities, 0) / (total * self.step)
+        grid = self.lo + (np.arange(size) - radius + 0.5) * self.step
+        return densities, grid
+
+
+def bin_column(data: pd.DataFrame, column, hue=None) -> BinnedColumn:
+    values = data[column].to_numpy(dtype='float64', na_value=np.nan)
+    if not hue:
+        return BinnedColumn(values)
+    codes, levels = pd.factorize(data[hue], sort=True)
+    # Rows without a hue level are left out, as seaborn does
+    values = np.where(codes >= 0, values, np.nan)
+    return BinnedColumn(values, np.maximum(codes, 0), [str(level) for level in levels])
+
+
+def can_bin(data: pd.DataFrame, x, y) -> bool:
+    """Univariate plot of a numeric column"""
+    if bool(x) == bool(y):
+        return False
+    series = data[x or y]
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def plot_hist(ax, binned: BinnedColumn, bins=HIST_BINS, palette='viridis', horizontal=False):
+    counts, edges = binned.histogram(bins)
+    colors = sns.color_palette(palette, len(binned.levels))
+    layered = len(binned.levels) > 1
+    orientation = 'horizontal' if horizontal else 'vertical'
+    for level_counts, level, color in zip(counts, binned.levels, colors):
+        ax.stairs(level_counts, edges, fill=True, alpha=0.5 if layered else 0.8, color=color,
+                  label=level, orientation=orientation)
+        ax.stairs(level_counts, edges, color=color, linewidth=0.8, orientation=orientation)
+
+
+def plot_kde(ax, binned: BinnedColumn, bw_adjust=1.0, palette='viridis', horizontal=False):
+    densities, grid = binned.kde(bw_adjust)
+    colors = sns.color_palette(palette, len(binned.levels))
+    for density, level, color in zip(densities, binned.levels, colors):
+        if horizontal:
+            ax.plot(density, grid, color=color, label=level)
+        else:
+            ax.plot(grid, density, color=color, label=level)
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+# Text columns with fewer unique values than this fraction of rows become categories
+CATEGORY_RATIO = 0.5
+
+
+def memory_usage(data: pd.DataFrame) -> int:
+    return int(data.memory_usage(deep=True).sum())
+
+
+def optimize_series(series: pd.Series, category_ratio=CATEGORY_RATIO, arrow_strings=True) -> pd.Series:
+    """Return the series converted to the smallest dtype that keeps all values"""
+    dtype = series.dtype
+
+    if pd.api.types.is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return series
+
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        return pd.to_numeric(series, downcast='unsigned' if series.min() >= 0 else 'integer')
+
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+        # Only downcast when every value survives the float32 round trip
+        downcast = series.astype('float32')
+        if np.array_equal(downcast.to_numpy(dtype='float64'), series.to_numpy(), equal_nan=True):
+            return downcast
+        return series
+
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if len(series) and series.nunique(dropna=True) <= category_ratio * len(series):
+            return series.astype('category')
+        if arrow_strings and pd.api.types.is_object_dtype(dtype) \
+                and pd.api.types.infer_dtype(series, skipna=True) == 'string':
+            return series.astype(pd.StringDtype('pyarrow'))
+
+    return series
+
+
+def optimize_dtypes(data: pd.DataFrame, category_ratio=CATEGORY_RATIO, arrow_strings=True) -> pd.DataFrame:
+    """Downcast numeric columns, turn low-cardinality text into categories
+    and remaining text into Arrow strings"""
+    result = data.copy(deep=False)
+    for i in range(result.shape[1]):
+        result.isetitem(i, optimize_series(result.iloc[:, i], category_ratio, arrow_strings))
+    return result
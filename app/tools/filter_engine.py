@@ -0,0 +1,238 @@
+import ast
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Key of the free-form query expression in the filters dict
+QUERY_KEY = "__query__"
+# Functions DataFrame.eval accepts in expressions
+EVAL_FUNCTIONS = {'sin', 'cos', 'tan', 'exp', 'log', 'expm1', 'log1p', 'sqrt', 'sinh', 'cosh', 'tanh',
+                  'arcsin', 'arccos', 'arctan', 'arccosh', 'arcsinh', 'arctanh', 'abs', 'arctan2'}
+
+
+class QueryRewriter(ast.NodeTransformer):
+    """Rewrite column.between(a, b) into comparisons numexpr can evaluate in one pass"""
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr == 'between' and len(node.args) == 2 \
+                and not node.keywords:
+            return ast.BinOp(
+                left=ast.Compare(left=func.value, ops=[ast.GtE()], comparators=[node.args[0]]),
+                op=ast.BitAnd(),
+                right=ast.Compare(left=func.value, ops=[ast.LtE()], comparators=[node.args[1]]))
+        return node
+
+
+def prepare_query(expression, columns) -> str:
+    """Validate the column names of an expression and rewrite it for DataFrame.eval"""
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError:
+        # Backtick-quoted column names are only understood by pandas itself
+        return expression
+
+    called = {node.func.id for node in ast.walk(tree)
+              if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)}
+    unknown = sorted({node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+                     - set(map(str, columns)) - called - EVAL_FUNCTIONS)
+    if unknown:
+        raise ValueError(f"Unknown column(s) in query: {', '.join(unknown)}")
+
+    return ast.unparse(ast.fix_missing_locations(QueryRewriter().visit(tree)))
+
+
+def positions_mask(size, positions) -> np.ndarray:
+    mask = np.zeros(size, dtype=bool)
+    mask[positions] = True
+    return mask
+
+
+class SortedIndex:
+    """Row positions of a numeric column ordered by value, missing values left out"""
+    def __init__(self, series: pd.Series):
+        if isinstance(series.dtype, np.dtype):
+            values = series.to_numpy()
+        else:
+            values = series.to_numpy(dtype='float64', na_value=np.nan)
+        order = np.argsort(values, kind='stable')
+        if values.dtype.kind == 'f':
+            # NaN sorts last, drop it so it never matches a range
+            order = order[:len(order) - np.count_nonzero(np.isnan(values))]
+        self.size = len(values)
+        self.order = order
+        self.sorted_values = values[order]
+
+    def range_positions(self, min_val=None, max_val=None) -> np.ndarray:
+        """Rows with min_val <= value <= max_val via two binary searches"""
+        lo = 0 if min_val is None else np.searchsorted(self.sorted_values, min_val, side='left')
+        hi = len(self.order) if max_val is None else np.searchsorted(self.sorted_values, max_val, side='right')
+        return self.order[lo:hi]
+
+
+class InvertedIndex:
+    """Row positions of every distinct value code of a column"""
+    def __init__(self, codes: np.ndarray):
+        self.size = len(codes)
+        self.order = np.argsort(codes, kind='stable')
+        self.starts = np.zeros(codes.max(initial=-1) + 2, dtype=np.intp)
+        np.cumsum(np.bincount(codes), out=self.starts[1:])
+
+    def positions(self, code) -> np.ndarray:
+        return self.order[self.starts[code]:self.starts[code + 1]]
+
+
+class ValueIndex:
+    """Distinct values of a column ordered by frequency, with case-insensitive prefix search"""
+    def __init__(self, series: pd.Series):
+        counts = series.value_counts(dropna=False)
+        self.texts = np.array([str(value) for value in counts.index], dtype=object)
+        self.counts = counts.to_numpy()
+        lowered = np.array([text.lower() for text in self.texts], dtype=object)
+        self.order = np.argsort(lowered, kind='stable')
+        self.sorted_texts = lowered[self.order]
+
+    def __len__(self):
+        return len(self.texts)
+
+    def top(self, k, prefix="") -> list:
+        """(text, count) of the k most frequent values starting with prefix"""
+        if not prefix:
+            ranks = np.arange(min(k, len(self.texts)))
+        else:
+            prefix = prefix.lower()
+            lo = np.searchsorted(self.sorted_texts, prefix, side='left')
+            hi = np.searchsorted(self.sorted_texts, prefix + '\U0010ffff', side='left')
+            # Values are stored by frequency, so the lowest positions are the most common
+            ranks = np.sort(self.order[lo:hi])[:k]
+        return [(self.texts[rank], int(self.counts[rank])) for rank in ranks]
+
+
+class FilterEngine:
+    """Evaluates FilterWidget filters as boolean row masks over one DataFrame.
+
+    A mask is cached per column and only recomputed when that column's
+    filter value changes, the masks are then combined in a single pass.
+    Numeric columns get a SortedIndex and text columns an InvertedIndex,
+    both built on first use and dropped by reset().
+    A query expression under QUERY_KEY is evaluated with DataFrame.eval,
+    its validated and rewritten text is cached per data schema and survives
+    reset(). pandas still parses and compiles the text on every evaluation.
+    apply() may run on a worker thread, calls are serialised by a lock.
+    """
+    def __init__(self, data: Optional[pd.DataFrame] = None):
+        self._lock = threading.Lock()
+        self._prepared_queries = {}
+        self.reset(data)
+
+    def reset(self, data: Optional[pd.DataFrame]):
+        """Switch to new data, invalidating cached masks, codes and indexes"""
+        with self._lock:
+            self.data = data
+            self._filters = {}
+            self._masks = {}
+            self._codes = {}
+            self._sorted_indexes = {}
+            self._inverted_indexes = {}
+
+    def sorted_index(self, column) -> SortedIndex:
+        if column not in self._sorted_indexes:
+            self._sorted_indexes[column] = SortedIndex(self.data[column])
+        return self._sorted_indexes[column]
+
+    def inverted_index(self, column) -> InvertedIndex:
+        if column not in self._inverted_indexes:
+            codes, _ = self.category_codes(column)
+            self._inverted_indexes[column] = InvertedIndex(codes)
+        return self._inverted_indexes[column]
+
+    def category_codes(self, column):
+        """Integer codes of a column and the codes matching each value's text, computed once"""
+        if column not in self._codes:
+            codes, uniques = pd.factorize(self.data[column], use_na_sentinel=False)
+            by_text = {}
+            for code, value in enumerate(uniques):
+                by_text.setdefault(str(value), []).append(code)
+            self._codes[column] = (codes, {text: np.array(c) for text, c in by_text.items()})
+        return self._codes[column]
+
+    def range_mask(self, column, min_val, max_val) -> Optional[np.ndarray]:
+        if min_val is None and max_val is None:
+            return None
+        index = self.sorted_index(column)
+        return positions_mask(index.size, index.range_positions(min_val, max_val))
+
+    def value_mask(self, column, value) -> Optional[np.ndarray]:
+        """Rows whose text equals value, or any of the values when given a list"""
+        if value == "(All)":
+            return None
+        _, by_text = self.category_codes(column)
+        index = self.inverted_index(column)
+        texts = value if isinstance(value, list) else [value]
+        positions = [index.positions(code) for text in texts for code in by_text.get(text, [])]
+        if not positions:
+            return np.zeros(index.size, dtype=bool)
+        return positions_mask(index.size, positions[0] if len(positions) == 1 else np.concatenate(positions))
+
+    def schema(self):
+        return tuple((str(column), str(dtype)) for column, dtype in self.data.dtypes.items())
+
+    def prepared_query(self, expression) -> str:
+        """Checked and rewritten text of an expression, the parsed form is not kept"""
+        key = (expression, self.schema())
+        if key not in self._prepared_queries:
+            self._prepared_queries[key] = prepare_query(expression, self.data.columns)
+        return self._prepared_queries[key]
+
+    def query_mask(self, expression) -> Optional[np.ndarray]:
+        """Mask of a query expression, evaluated by numexpr when it is installed"""
+        if not expression.strip():
+            return None
+        result = self.data.eval(self.prepared_query(expression))
+        if not isinstance(result, pd.Series) or not pd.api.types.is_bool_dtype(result):
+            raise ValueError("Query must evaluate to a boolean condition")
+        return result.to_numpy(dtype=bool, na_value=False)
+
+    def column_mask(self, column, value) -> Optional[np.ndarray]:
+        """Mask of one filter control, None when it does not restrict rows"""
+        if column == QUERY_KEY:
+            return self.query_mask(value)
+        if pd.api.types.is_numeric_dtype(self.data[column]):
+            return self.range_mask(column, *value)
+        return self.value_mask(column, value)
+
+    def set_filters(self, filters, worker=None):
+        """Update the cached masks, recomputing only the columns whose filter changed.
+        A worker is checked for cancellation before each column."""
+        for column in list(self._filters):
+            if column not in filters:
+                del self._filters[column]
+                del self._masks[column]
+
+        for column, value in filters.items():
+            if column in self._filters and self._filters[column] == value:
+                continue
+            if worker is not None:
+                worker.check_cancelled()
+            self._masks[column] = self.column_mask(column, value)
+            self._filters[column] = value
+
+    def mask(self) -> Optional[np.ndarray]:
+        """Combined mask of all filters, None when every row passes"""
+        masks = [mask for mask in self._masks.values() if mask is not None]
+        if not masks:
+            return None
+        if len(masks) == 1:
+            return masks[0]
+        return np.logical_and.reduce(masks)
+
+    def apply(self, filters, worker=None) -> Optional[np.ndarray]:
+        """Row positions passing the filters, None when every row passes"""
+        with self._lock:
+            self.set_filters(filters, worker)
+            mask = self.mask()
+        if mask is None or mask.all():
+            return None
+        return np.flatnonzero(mask)
@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import matplotlib.dates as mdates
+from matplotlib.colors import LogNorm
+
+# Above this many rows line and scatter plots are drawn at a reduced level of detail
+POINT_BUDGET = 100_000
+# x buckets of a decimated line, each keeps its first, last, min and max point
+LINE_BUCKETS = 2000
+# Bins per axis of the density image replacing a large scatter plot
+DENSITY_BINS = 256
+# Share of rows that may repeat an x value of their hue level for a line to count as a series
+SERIES_REPEAT_SHARE = 0.1
+
+
+def column_array(series: pd.Series) -> np.ndarray:
+    """Column as datetime64 or float64 array, missing values as NaT/NaN"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dtype, 'tz', None) is not None:
+            series = series.dt.tz_localize(None)
+        return series.to_numpy(dtype='datetime64[ns]')
+    return series.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def numeric_axis(values) -> np.ndarray:
+    """Values of a numeric or datetime column as float64 in Matplotlib data units"""
+    values = np.asarray(values)
+    if values.dtype.kind == 'M':
+        return mdates.date2num(values)
+    return values.astype('float64', copy=False)
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, buckets=LINE_BUCKETS) -> np.ndarray:
+    """Positions of the first, last, lowest and highest point of every x bucket.
+
+    x must be sorted. Buckets are equally wide in x, so each covers about a
+    pixel column and the drawn envelope matches the full line.
+    """
+    if len(x) <= 4 * buckets:
+        return np.arange(len(x))
+    edges = np.linspace(x[0], x[-1], buckets + 1)[1:-1]
+    starts = np.unique(np.concatenate([[0], np.searchsorted(x, edges, side='left')]))
+    starts = starts[starts < len(x)]
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(x))))
+
+    lowest = np.minimum.reduceat(y, starts)
+    highest = np.maximum.reduceat(y, starts)
+    # First position of each bucket where the extreme value occurs
+    at_min = np.flatnonzero(y == lowest[bucket])
+    at_max = np.flatnonzero(y == highest[bucket])
+    _, first_min = np.unique(bucket[at_min], return_index=True)
+    _, first_max = np.unique(bucket[at_max], return_index=True)
+
+    ends = np.append(starts[1:], len(x)) - 1
+    return np.unique(np.concatenate([starts, ends, at_min[first_min], at_max[first_max]]))
+
+
+def stratified_sample(data: pd.DataFrame, columns, budget, seed=0) -> pd.DataFrame:
+    """About budget rows of data, sampled at the same rate from each group of columns.
+    Every group keeps at least one row so no hue level or facet disappears."""
+    n = len(data)
+    if n <= budget:
+        return data
+    rng = np.random.default_rng(seed)
+    if not columns:
+        return data.iloc[np.sort(rng.choice(n, budget, replace=False))]
+
+    codes = data.groupby(list(columns), observed=True, dropna=False, sort=False).ngroup().to_numpy()
+    # Each row is kept with the same probability, no sort needed
+    keep = rng.random(n) < (budget / n)
+    # The first row of every group is always kept
+    _, first = np.unique(codes, return_index=True)
+    keep[first] = True
+    return data.iloc[np.flatnonzero(keep)]
+
+
+def add_lod_label(ax, text):
+    """Small note in the axes corner telling the plot is not drawn at full detail"""
+    return ax.text(0.99, 0.01, text, transform=ax.transAxes, ha='right', va='bottom',
+                   fontsize=8, color='0.3', zorder=10,
+                   bbox=dict(boxstyle='round', facecolor='white', alpha=0.7, edgecolor='0.8'))
+
+
+class LodLine:
+    """Full x-sorted data of one line, drawn decimated to the visible x range.
+
+    limits() is read in the GUI thread, window(*limits) may run on a worker
+    and update() applies its result to the artist.
+    """
+    def __init__(self, x_values, y_values, buckets=LINE_BUCKETS):
+        x = numeric_axis(x_values)
+        y = numeric_axis(y_values)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        order = np.argsort(x[valid], kind='stable')
+        self.x_values = np.asarray(x_values)[valid][order]
+        self.x = x[valid][order]
+        self.y = y[valid][order]
+        self.buckets = buckets
+        self.artist = None
+
+    def __len__(self):
+        return len(self.x)
+
+    def window(self, xmin=None, xmax=None):
+        """Decimated (x, y) of the points between xmin and xmax, plus one on each side"""
+        lo = 0 if xmin is None else max(0, np.searchsorted(self.x, xmin, side='left') - 1)
+        hi = len(self.x) if xmax is None else np.searchsorted(self.x, xmax, side='right') + 1
+        positions = lo + minmax_indices(self.x[lo:hi], self.y[lo:hi], self.buckets)
+        return self.x_values[positions], self.y[positions]
+
+    def limits(self):
+        return self.artist.axes.get_xlim()
+
+    def update(self, window):
+        self.artist.set_data(*window)
+
+
+class LodDensity:
+    """Full data of a scatter plot, drawn as a 2D count image of the visible range"""
+    def __init__(self, x_values, y_values, bins=DENSITY_BINS):
+        x = numeric_axis(x_values)
+        y = numeric_axis(y_values)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        self.x = x[valid]
+        self.y = y[valid]
+        self.bins = bins
+        self.artist = None
+
+    def __len__(self):
+        return len(self.x)
+
+    def window(self, xlim=None, ylim=None):
+        """(counts, extent) of the points inside the limits, counts indexed [y, x]"""
+        x0, x1 = xlim if xlim is not None else (self.x.min(), self.x.max())
+        y0, y1 = ylim if ylim is not None else (self.y.min(), self.y.max())
+        if x1 <= x0:
+            x1 = x0 + 1
+        if y1 <= y0:
+            y1 = y0 + 1
+        inside = (self.x >= x0) & (self.x <= x1) & (self.y >= y0) & (self.y <= y1)
+        ix = np.minimum(((self.x[inside] - x0) * (self.bins / (x1 - x0))).astype(np.intp), self.bins - 1)
+        iy = np.minimum(((self.y[inside] - y0) * (self.bins / (y1 - y0))).astype(np.intp), self.bins - 1)
+        counts = np.bincount(iy * self.bins + ix, minlength=self.bins * self.bins)
+        return counts.reshape(self.bins, self.bins), (x0, x1, y0, y1)
+
+    def limits(self):
+        return self.artist.axes.get_xlim(), self.artist.axes.get_ylim()
+
+    def update(self, window):
+        counts, extent = window
+        self.artist.set_data(np.ma.masked_equal(counts, 0))
+        # set_extent rescales autoscaled axes, which would request another re-sample
+        self.artist.axes.set_autoscale_on(False)
+        self.artist.set_extent(extent)
+        self.artist.set_clim(1, max(counts.max(), 1))
+
+
+def can_decimate(data: pd.DataFrame, x, y) -> bool:
+    """Whether x and y are numeric or datetime columns LOD drawing can handle"""
+    if not x or not y:
+        return False
+    return all(pd.api.types.is_numeric_dtype(data[c]) and not pd.api.types.is_bool_dtype(data[c])
+               or pd.api.types.is_datetime64_any_dtype(data[c]) for c in (x, y))
+
+
+def is_series(data: pd.DataFrame, x, hue=None, repeat_share=SERIES_REPEAT_SHARE) -> bool:
+    """Whether x barely repeats within each hue level, as in a time series.
+
+    Min/max decimation keeps the look of such lines. Lines with repeated x
+    values show the mean of y per x and have to be aggregated instead.
+    """
+    if hue:
+        distinct = data.groupby(hue, observed=True)[x].nunique().sum()
+    else:
+        distinct = data[x].nunique()
+    return distinct >= (1 - repeat_share) * len(data)
+
+
+def plot_lod_lines(ax, data: pd.DataFrame, x, y, hue=None, palette='viridis') -> list:
+    """Draw one decimated line per hue level and return their LodLine layers"""
+    if hue:
+        groups = [(str(level), group) for level, group in data.groupby(hue, observed=True, sort=True)]
+    else:
+        groups = [(None, data)]
+    colors = sns.color_palette(palette, len(groups))
+
+    layers = []
+    for (label, group), color in zip(groups, colors):
+        layer = LodLine(column_array(group[x]), column_array(group[y]))
+        layer.artist, = ax.plot(*layer.window(), color=color, label=label, linewidth=1)
+        layers.append(layer)
+
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    if hue:
+        ax.legend(title=hue)
+    add_lod_label(ax, f"Decimated: {len(data):,} points, min/max per x bucket")
+    return layers
+
+
+def density_cmap(palette):
+    try:
+        return sns.color_palette(palette, as_cmap=True)
+    except (ValueError, TypeError):
+        return 'viridis'
+
+
+def plot_density(ax, data: pd.DataFrame, x, y, palette='viridis') -> LodDensity:
+    """Draw a scatter plot as a log-scaled 2D count image and return its layer"""
+    layer = LodDensity(column_array(data[x]), column_array(data[y]))
+    counts, extent = layer.window()
+    layer.artist = ax.imshow(np.ma.masked_equal(counts, 0), origin='lower', extent=extent,
+                             aspect='auto', interpolation='nearest', cmap=density_cmap(palette),
+                             norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)))
+    ax.figure.colorbar(layer.artist, ax=ax, label='Count')
+    if pd.api.types.is_datetime64_any_dtype(data[x]):
+        ax.xaxis_date()
+    if pd.api.types.is_datetime64_any_dtype(data[y]):
+        ax.yaxis_date()
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    add_lod_label(ax, f"Binned: {len(layer):,} points")
+    return layer
@@ -0,0 +1,119 @@
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+MAX_ENTRIES = 32
+MAX_CACHE_BYTES = 512 * 1024 ** 2
+
+
+def params_key(plot_params) -> str:
+    """Stable text form of a plot_params dict"""
+    return json.dumps(plot_params, sort_keys=True, default=str)
+
+
+def figure_nbytes(figure: Figure) -> int:
+    """Approximate memory held by a figure's plotted data"""
+    total = 0
+    for layer in getattr(figure, 'lod_layers', []):
+        total += sum(value.nbytes for value in vars(layer).values() if isinstance(value, np.ndarray))
+    for ax in figure.axes:
+        total += sum(line.get_xydata().nbytes for line in ax.lines)
+        total += sum(np.asarray(collection.get_offsets()).nbytes for collection in ax.collections)
+        total += sum(np.asarray(image.get_array()).nbytes for image in ax.images)
+    return total
+
+
+def value_nbytes(value) -> int:
+    if isinstance(value, Figure):
+        return figure_nbytes(value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, np.ndarray) or hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, (tuple, list)):
+        return sum(value_nbytes(item) for item in value)
+    return 0
+
+
+class PlotCache:
+    """In-memory LRU of rendered figures and intermediate aggregates.
+
+    Entries are evicted once there are more than max_entries of them or
+    they hold more than max_bytes of data. Keys start with a fingerprint
+    of the plotted rows, see bind().
+    """
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._nbytes
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = value_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._nbytes += size
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until both bounds hold, the newest always stays"""
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries
+                                          or self._nbytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._nbytes -= size
+
+    def get_or_compute(self, key, compute):
+        """Cached value of key, computed and stored on a miss. None results are not stored"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def bind(self, fingerprint) -> 'BoundPlotCache':
+        return BoundPlotCache(self, fingerprint)
+
+
+class BoundPlotCache:
+    """View of a PlotCache whose keys are prefixed with one data fingerprint"""
+    def __init__(self, cache: PlotCache, fingerprint):
+        self.cache = cache
+        self.fingerprint = fingerprint
+
+    def get(self, key):
+        return self.cache.get((self.fingerprint, key))
+
+    def put(self, key, value):
+        self.cache.put((self.fingerprint, key), value)
+
+    def get_or_compute(self, key, compute):
+        return self.cache.get_or_compute((self.fingerprint, key), compute)
@@ -1,10 +1,99 @@
+import numpy as np
 import seaborn as sns
 import pandas as pd
 from matplotlib.figure import Figure
-from typing import Optional, Dict
+from typing import Optional, Dict, List
+
+from app.tools import density, lod
+from app.tools.aggregation import STAT_AGGREGATIONS, aggregate, group_stats, pivot_grid, summarize
+from app.tools.plot_cache import BoundPlotCache, params_key
+from app.tools.workers import WorkerCancelled
+
+
+# Heatmaps with more cells are drawn without value annotations
+ANNOTATE_MAX_CELLS = 400
+MAX_TICK_LABELS = 50
 
 
 class PlotGenerator:
+    @staticmethod
+    def columns_used(plttype: str = 'bar', x=None, y=None, hue=None, row=None, col=None,
+                     filters=None, value=None, **kwargs) -> Optional[List[str]]:
+        """Columns a plot reads from the data, None when it needs all of them"""
+        columns = [c for c in (x, y, hue, row, col, value) if c]
+        columns += [c for c in (filters or {}) if c not in columns]
+        return list(dict.fromkeys(columns)) or None
+
+    @staticmethod
+    def relplot(df, kind, x, y, hue, row, col, palette, figsize, point_budget, **kwargs):
+        """Facetted line or scatter plot, on a stratified sample above point_budget rows"""
+        sample = lod.stratified_sample(df, [c for c in (hue, row, col) if c], point_budget)
+        g = sns.relplot(data=sample, x=x, y=y, hue=hue,
+                        row=row, col=col, kind=kind,
+                        palette=palette, height=figsize[1], **kwargs)
+        if len(sample) < len(df):
+            g.fig.text(0.99, 0.01, f"Sampled: {len(sample):,} of {len(df):,} points",
+                       ha='right', va='bottom', fontsize=8, color='0.3')
+        return g
+
+    @staticmethod
+    def summary_plot(ax, plttype, summary, x, y, hue, aggregation, palette, descending=False):
+        """Grouped bars or lines of aggregated values with 95% error bars or bands"""
+        table = summary['value'].unstack(hue) if hue else summary[['value']]
+        errors = summary['error'].unstack(hue) if hue else summary[['error']].set_axis(['value'], axis=1)
+        if descending:
+            table, errors = table.iloc[::-1], errors.iloc[::-1]
+        colors = sns.color_palette(palette, table.shape[1])
+        labels = [str(level) for level in table.columns] if hue else [None]
+        numeric_x = plttype == 'line' and (pd.api.types.is_numeric_dtype(table.index)
+                                           or pd.api.types.is_datetime64_any_dtype(table.index))
+        positions = table.index.to_numpy() if numeric_x else np.arange(len(table))
+
+        if plttype == 'bar':
+            width = 0.8 / table.shape[1]
+            for i, (column, color, label) in enumerate(zip(table.columns, colors, labels)):
+                offset = (i - (table.shape[1] - 1) / 2) * width
+                ax.bar(positions + offset, table[column].to_numpy(), width, color=color, label=label,
+                       yerr=errors[column].to_numpy(), capsize=3, error_kw={'elinewidth': 1})
+        else:
+            for column, color, label in zip(table.columns, colors, labels):
+                values = table[column].to_numpy()
+                error = errors[column].to_numpy()
+                present = ~np.isnan(values)
+                ax.plot(positions[present], values[present], color=color, label=label)
+                if not np.isnan(error[present]).all():
+                    ax.fill_between(positions[present], (values - error)[present], (values + error)[present],
+                                    color=color, alpha=0.2, linewidth=0)
+
+        if not numeric_x:
+            ax.set_xticks(positions)
+            ax.set_xticklabels([str(value) for value in table.index])
+        ax.set_xlabel(x)
+        ax.set_ylabel(y if not aggregation else f"{aggregation}({y})")
+        if hue:
+            ax.legend(title=hue)
+
+    @staticmethod
+    def heatmap(ax, grid, row_labels, column_labels, palette, label=None):
+        """Grid drawn as one image, annotated only when it has few enough cells"""
+        image = ax.imshow(np.ma.masked_invalid(grid), aspect='auto', interpolation='nearest',
+                          cmap=lod.density_cmap(palette))
+        ax.figure.colorbar(image, ax=ax, label=label)
+
+        for axis_ticks, labels in ((ax.set_yticks, row_labels), (ax.set_xticks, column_labels)):
+            # Long axes only label every step-th cell
+            step = max(1, -(-len(labels) // MAX_TICK_LABELS))
+            positions = np.arange(0, len(labels), step)
+            axis_ticks(positions, [str(labels[i]) for i in positions])
+
+        if grid.size <= ANNOTATE_MAX_CELLS:
+            # Text colour follows the cell brightness like seaborn's annot
+            colors = image.cmap(image.norm(grid))
+            luminance = colors[..., :3] @ np.array([0.299, 0.587, 0.114])
+            for i, j in zip(*np.nonzero(~np.isnan(grid))):
+                ax.text(j, i, f"{grid[i, j]:.4g}", ha='center', va='center', fontsize=8,
+                        color='black' if luminance[i, j] > 0.5 else 'white')
+
     @staticmethod
     def generate(
             data: pd.DataFrame,
@@ -19,22 +108,61 @@ class PlotGenerator:
             sort: Optional[str] = None,
             palette: str = 'viridis',
             title: Optional[str] = None,
-            figsize: tuple = (10, 6)
+            figsize: tuple = (10, 6),
+            value: Optional[str] = None,
+            point_budget: int = lod.POINT_BUDGET,
+            fast: bool = False,
+            bins: Optional[int] = None,
+            bw_adjust: float = 1.0,
+            cache: Optional[BoundPlotCache] = None,
+            worker=None,
+            raise_errors: bool = False
     ) -> Figure:
-        df = data.copy()
+        # Every step below builds new frames, the input is never modified
+        df = data
+
+        def check_cancelled():
+            if worker is not None:
+                worker.check_cancelled()
+
+        def cached(key, compute):
+            """Aggregates are reused across plots of the same rows and filters"""
+            if cache is None:
+                return compute()
+            return cache.get_or_compute((key, params_key(filters)), compute)
 
         # Filter data
         if filters:
-            for column, value in filters.items():
-                if isinstance(value, list):
-                    df = df[df[column].isin(value)]
+            for column, wanted in filters.items():
+                if isinstance(wanted, list):
+                    df = df[df[column].isin(wanted)]
                 else:
-                    df = df[df[column] == value]
+                    df = df[df[column] == wanted]
+        check_cancelled()
+
+        # Large lines are decimated when x is a series coordinate, otherwise y is
+        # aggregated per x first, as seaborn draws the mean of y for every x
+        large_line = (plttype == 'line' and not (row or col) and len(df) > point_budget
+                      and lod.can_decimate(df, x, y))
+        aggregate_line = large_line and not lod.is_series(df, x, hue)
+        # Bar and line plots drawn straight from per-group statistics, no bootstrapping
+        fast = ((fast or aggregate_line) and plttype in ('bar', 'line') and x and y
+                and (aggregation or 'mean') in STAT_AGGREGATIONS
+                and pd.api.types.is_numeric_dtype(df[y]) and not pd.api.types.is_bool_dtype(df[y])
+                and not (large_line and not aggregate_line))
+        keys = [c for c in (x, hue, row, col) if c]
+        # Facet grids get one aggregated row per group, so seaborn draws no error bars
+        facet_kwargs = {'errorbar': None} if fast and (row or col) else {}
 
         # Data aggregation if required
-        if aggregation and x and y:
-            df_agg = df.groupby(x)[y].agg(aggregation).reset_index()
-            df = df_agg
+        summary = None
+        if fast and not (row or col):
+            # Statistics do not depend on the aggregation, switching it reuses them
+            summary = summarize(cached(('stats', tuple(keys), y), lambda: group_stats(df, keys, y)),
+                                aggregation)
+        elif (fast or aggregation or aggregate_line) and x and y and plttype != 'heatmap':
+            df = cached(('aggregate', tuple(keys), y, aggregation or 'mean'),
+                        lambda: aggregate(df, keys, y, aggregation or 'mean'))
 
         # Sort data
         if sort:
@@ -42,18 +170,27 @@ class PlotGenerator:
                 df = df.sort_values(by=x if x else y, ascending=True)
             elif sort.lower() == 'desc':
                 df = df.sort_values(by=x if x else y, ascending=False)
+        check_cancelled()
 
         fig = Figure(figsize=figsize)
         ax = fig.add_subplot(111)
+        # Layers drawn at reduced detail, re-sampled when the view is zoomed
+        lod_layers = []
+        # Line and scatter plots with more rows than point_budget are decimated
+        decimate = plttype in ('line', 'scatter') and len(df) > point_budget
 
         try:
             # Plot type selection
-            if plttype == 'bar':
+            if summary is not None:
+                PlotGenerator.summary_plot(ax, plttype, summary, x, y, hue, aggregation,
+                                           palette, descending=(sort or '').lower() == 'desc')
+
+            elif plttype == 'bar':
                 if row or col:
                     fig.clf()
                     g = sns.catplot(data=df, x=x, y=y, hue=hue,
                                     row=row, col=col, kind='bar',
-                                    palette=palette, height=figsize[1])
+                                    palette=palette, height=figsize[1], **facet_kwargs)
                     fig = g.fig
                     if hue:
                         g.add_legend()
@@ -65,12 +202,13 @@ class PlotGenerator:
             elif plttype == 'line':
                 if row or col:
                     fig.clf()
-                    g = sns.relplot(data=df, x=x, y=y, hue=hue,
-                                    row=row, col=col, kind='line',
-                                    palette=palette, height=figsize[1])
+                    g = PlotGenerator.relplot(df, 'line', x, y, hue, row, col, palette,
+                                              figsize, point_budget, **facet_kwargs)
                     fig = g.fig
                     if hue:
                         g.add_legend()
+                elif decimate and lod.can_decimate(df, x, y):
+                    lod_layers = lod.plot_lod_lines(ax, df, x, y, hue, palette)
                 else:
                     sns.lineplot(data=df, x=x, y=y, hue=hue, palette=palette, ax=ax)
                     if hue:
@@ -79,12 +217,20 @@ class PlotGenerator:
             elif plttype == 'scatter':
                 if row or col:
                     fig.clf()
-                    g = sns.relplot(data=df, x=x, y=y, hue=hue,
-                                    row=row, col=col, kind='scatter',
-                                    palette=palette, height=figsize[1])
+                    g = PlotGenerator.relplot(df, 'scatter', x, y, hue, row, col, palette,
+                                              figsize, point_budget)
                     fig = g.fig
                     if hue:
                         g.add_legend()
+                elif decimate and not hue and lod.can_decimate(df, x, y):
+                    lod_layers = [lod.plot_density(ax, df, x, y, palette)]
+                elif decimate:
+                    # Hue colours cannot be binned, draw a sample keeping every level
+                    sample = lod.stratified_sample(df, [hue] if hue else [], point_budget)
+                    sns.scatterplot(data=sample, x=x, y=y, hue=hue, palette=palette, ax=ax)
+                    lod.add_lod_label(ax, f"Sampled: {len(sample):,} of {len(df):,} points")
+                    if hue:
+                        ax.legend(title=hue)
                 else:
                     sns.scatterplot(data=df, x=x, y=y, hue=hue, palette=palette, ax=ax)
                     if hue:
@@ -100,26 +246,43 @@ class PlotGenerator:
                 if hue:
                     ax.legend(title=hue)
 
+            elif plttype in ('hist', 'kde') and density.can_bin(df, x, y):
+                # Fine-grid counts are shared by any bin count or bandwidth of the same column
+                binned = cached(('binned', x or y, hue), lambda: density.bin_column(df, x or y, hue))
+                if plttype == 'hist':
+                    density.plot_hist(ax, binned, bins or density.HIST_BINS, palette, horizontal=not x)
+                else:
+                    density.plot_kde(ax, binned, bw_adjust, palette, horizontal=not x)
+                ax.set_xlabel(x or ('Count' if plttype == 'hist' else 'Density'))
+                ax.set_ylabel(y or ('Count' if plttype == 'hist' else 'Density'))
+                if hue:
+                    ax.legend(title=hue)
+
             elif plttype == 'hist':
-                sns.histplot(data=df, x=x, y=y, hue=hue, palette=palette, ax=ax)
+                sns.histplot(data=df, x=x, y=y, hue=hue, palette=palette, ax=ax,
+                             **({'bins': bins} if bins else {}))
                 if hue:
                     ax.legend(title=hue)
 
             elif plttype == 'kde':
-                sns.kdeplot(data=df, x=x, y=y, hue=hue, palette=palette, ax=ax)
+                sns.kdeplot(data=df, x=x, y=y, hue=hue, palette=palette, ax=ax, bw_adjust=bw_adjust)
                 if hue:
                     ax.legend(title=hue)
 
             elif plttype == 'heatmap':
-                if x and y and aggregation:
-                    pivot = df.pivot_table(index=x, columns=y, aggfunc=aggregation)
-                    sns.heatmap(pivot, annot=True, fmt='g', ax=ax)
+                if x and y:
+                    grid = cached(('pivot', x, y, value, aggregation),
+                                  lambda: pivot_grid(df, x, y, value, aggregation))
+                    label = f"{aggregation or 'mean'}({value})" if value else (aggregation or 'count')
+                    PlotGenerator.heatmap(ax, *grid, palette, label)
+                    ax.set_ylabel(x)
+                    ax.set_xlabel(y)
                 else:
-                    raise ValueError("To generate Heatmap plot, aggregation is required")
+                    raise ValueError("Heatmap requires x and y parameters")
 
             elif plttype == 'pie':
                 if x and y:
-                    df_agg = df.groupby(x)[y].sum()
+                    df_agg = cached(('sum', x, y), lambda: aggregate(df, [x], y, 'sum').set_index(x)[y])
                     df_agg.plot.pie(ax=ax, autopct='%1.1f%%')
                 else:
                     raise ValueError("Pie chart requires x and y parameters")
@@ -137,15 +300,22 @@ class PlotGenerator:
             else:
                 raise ValueError(f"Unknown plot type: {plttype}")
 
+            check_cancelled()
             if title:
                 ax.set_title(title)
 
-            if x and len(df[x].unique()) > 5:
+            # The head usually settles it without counting every distinct value
+            if x and (df[x].head(1000).nunique() > 5 or df[x].nunique() > 5):
                 ax.tick_params(axis='x', rotation=45)
 
             fig.tight_layout()
+            fig.lod_layers = lod_layers
             return fig
 
+        except WorkerCancelled:
+            raise
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Error generating plot: {e}")
             return None
\ No newline at end of file
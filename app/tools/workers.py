@@ -0,0 +1,61 @@
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+
+class WorkerCancelled(Exception):
+    """Raised inside a task when its worker has been cancelled"""
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by Worker (delivered in the GUI thread)"""
+    progress = pyqtSignal(object)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Run fn(worker, *args, **kwargs) on a QThreadPool thread.
+
+    The task receives the worker itself so it can report progress and
+    poll for cancellation between units of work.
+    """
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        # Python keeps ownership so cancel() stays valid after run() returns
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Abort the task if cancel() was requested"""
+        if self._cancel_event.is_set():
+            raise WorkerCancelled()
+
+    def report(self, value):
+        self.signals.progress.emit(value)
+
+    def run(self):
+        try:
+            result = self.fn(self, *self.args, **self.kwargs)
+        except WorkerCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+
+        if self.is_cancelled():
+            self.signals.cancelled.emit()
+        else:
+            self.signals.finished.emit(result)
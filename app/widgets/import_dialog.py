@@ -0,0 +1,103 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QComboBox, QCheckBox, QLabel,
+                             QTableWidget, QTableWidgetItem, QPushButton, QDialogButtonBox, QHeaderView)
+from PyQt6.QtCore import Qt
+import pandas as pd
+
+from app.tools.data_loader import DTYPE_CHOICES, default_options
+
+PREVIEW_ROWS = 100
+
+
+class ImportDialog(QDialog):
+    """Choose parse engine, columns and column types before loading a CSV"""
+    def __init__(self, file_name, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Import Options")
+        self.setMinimumSize(500, 500)
+        # Only a small sample is parsed to list the columns
+        self.preview = pd.read_csv(file_name, nrows=PREVIEW_ROWS)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItem("pandas (C parser)", "pandas")
+        self.engine_combo.addItem("pyarrow (multithreaded)", "pyarrow")
+        form.addRow("Parse engine:", self.engine_combo)
+
+        self.arrow_dtypes_check = QCheckBox("Use Arrow-backed dtypes")
+        form.addRow(self.arrow_dtypes_check)
+
+        self.optimize_check = QCheckBox("Optimise dtypes after loading (downcast, categories)")
+        form.addRow(self.optimize_check)
+        layout.addLayout(form)
+
+        layout.addWidget(QLabel("Columns to load:"))
+        self.columns_table = QTableWidget(len(self.preview.columns), 3)
+        self.columns_table.setHorizontalHeaderLabels(["Column", "Detected", "Load as"])
+        self.columns_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.columns_table.verticalHeader().hide()
+
+        for row, column in enumerate(self.preview.columns):
+            name_item = QTableWidgetItem(str(column))
+            name_item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable)
+            name_item.setCheckState(Qt.CheckState.Checked)
+            self.columns_table.setItem(row, 0, name_item)
+
+            detected_item = QTableWidgetItem(str(self.preview[column].dtype))
+            detected_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+            self.columns_table.setItem(row, 1, detected_item)
+
+            dtype_combo = QComboBox()
+            dtype_combo.addItems(DTYPE_CHOICES)
+            self.columns_table.setCellWidget(row, 2, dtype_combo)
+
+        layout.addWidget(self.columns_table)
+
+        select_layout = QHBoxLayout()
+        select_all_btn = QPushButton("Select All")
+        select_all_btn.clicked.connect(lambda: self.set_all_checked(True))
+        select_none_btn = QPushButton("Select None")
+        select_none_btn.clicked.connect(lambda: self.set_all_checked(False))
+        select_layout.addWidget(select_all_btn)
+        select_layout.addWidget(select_none_btn)
+        layout.addLayout(select_layout)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def set_all_checked(self, checked):
+        state = Qt.CheckState.Checked if checked else Qt.CheckState.Unchecked
+        for row in range(self.columns_table.rowCount()):
+            self.columns_table.item(row, 0).setCheckState(state)
+
+    def options(self):
+        """Import options in the format expected by load_file"""
+        options = default_options()
+        options['engine'] = self.engine_combo.currentData()
+        options['arrow_dtypes'] = self.arrow_dtypes_check.isChecked()
+        options['optimize_dtypes'] = self.optimize_check.isChecked()
+
+        usecols = []
+        for row, column in enumerate(self.preview.columns):
+            if self.columns_table.item(row, 0).checkState() != Qt.CheckState.Checked:
+                continue
+            usecols.append(column)
+            kind = self.columns_table.cellWidget(row, 2).currentText()
+            if kind != "auto":
+                options['dtypes'][column] = kind
+
+        # Leave usecols unset when everything is selected
+        if len(usecols) < len(self.preview.columns):
+            options['usecols'] = usecols
+        return options
+
+    def accept(self):
+        if not any(self.columns_table.item(row, 0).checkState() == Qt.CheckState.Checked
+                   for row in range(self.columns_table.rowCount())):
+            return
+        super().accept()
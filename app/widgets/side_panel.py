@@ -1,10 +1,17 @@
 from PyQt6.QtWidgets import (QFrame, QVBoxLayout, QLabel, QPushButton,
-                             QHBoxLayout, QLineEdit, QComboBox, QGroupBox, QWidget)
-from PyQt6.QtCore import pyqtSignal, Qt
+                             QHBoxLayout, QLineEdit, QComboBox, QGroupBox, QWidget, QListView, QListWidget,
+                             QListWidgetItem, QCheckBox, QSpinBox, QDoubleSpinBox)
+from PyQt6.QtCore import pyqtSignal, Qt, QSortFilterProxyModel, QStringListModel, QThreadPool, QTimer
 import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+from app.tools.filter_engine import QUERY_KEY, ValueIndex
+from app.tools.aggregation import STAT_AGGREGATIONS
+from app.tools.density import HIST_BINS
+from app.tools.lod import POINT_BUDGET
+from app.tools.workers import Worker
+
 
 class SidePanel(QFrame):
     """Container for FilterWidget, PlotWidget"""
@@ -40,18 +47,208 @@ class SidePanel(QFrame):
         self.plot_widget.update_controls(data)
 
 
+# Number of most frequent values listed by CategoryPicker
+TOP_K_VALUES = 50
+LIVE_FILTER_DELAY_MS = 300
+HIST_MAX_BINS = 1000
+
+
+def compute_column_stats(worker, series):
+    """Statistics a filter control needs: value range or a ValueIndex of value counts"""
+    if pd.api.types.is_numeric_dtype(series):
+        return {'min': series.min(), 'max': series.max()}
+    return {'values': ValueIndex(series)}
+
+
+class CategoryPicker(QWidget):
+    """Multi-value picker listing the top values by frequency, with prefix search"""
+    selection_changed = pyqtSignal()
+
+    def __init__(self, value_index, top_k=TOP_K_VALUES):
+        super().__init__()
+        self.value_index = value_index
+        self.top_k = top_k
+        self.selected = set()
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search values...")
+        self.search.textChanged.connect(self.refresh)
+        layout.addWidget(self.search)
+
+        self.values_list = QListWidget()
+        self.values_list.setMaximumHeight(150)
+        self.values_list.itemChanged.connect(self.on_item_changed)
+        layout.addWidget(self.values_list)
+
+        footer = QHBoxLayout()
+        self.info_label = QLabel()
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(self.clear_selection)
+        footer.addWidget(self.info_label)
+        footer.addWidget(clear_btn)
+        layout.addLayout(footer)
+
+        self.refresh()
+
+    def refresh(self):
+        """List the most frequent values matching the search prefix"""
+        self.values_list.blockSignals(True)
+        self.values_list.clear()
+        for text, count in self.value_index.top(self.top_k, self.search.text()):
+            item = QListWidgetItem(f"{text} ({count})")
+            item.setData(Qt.ItemDataRole.UserRole, text)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if text in self.selected else Qt.CheckState.Unchecked)
+            self.values_list.addItem(item)
+        self.values_list.blockSignals(False)
+        self.update_info()
+
+    def on_item_changed(self, item):
+        text = item.data(Qt.ItemDataRole.UserRole)
+        if item.checkState() == Qt.CheckState.Checked:
+            self.selected.add(text)
+        else:
+            self.selected.discard(text)
+        self.update_info()
+        self.selection_changed.emit()
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.refresh()
+        self.selection_changed.emit()
+
+    def update_info(self):
+        self.info_label.setText(f"{len(self.selected)} selected, {len(self.value_index)} distinct")
+
+    def value(self):
+        """Selected values as a list, "(All)" when nothing is selected"""
+        return sorted(self.selected) if self.selected else "(All)"
+
+
+class ColumnFilter(QFrame):
+    """Filter control of one column, filled in once its statistics are known"""
+    remove_requested = pyqtSignal(str)
+    changed = pyqtSignal()
+
+    def __init__(self, column, numeric):
+        super().__init__()
+        self.column = column
+        self.numeric = numeric
+        self.control = None
+
+        self.layout = QVBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+
+        header = QHBoxLayout()
+        header.addWidget(QLabel(str(column)))
+        remove_btn = QPushButton("Remove")
+        remove_btn.clicked.connect(lambda: self.remove_requested.emit(self.column))
+        header.addWidget(remove_btn)
+        self.layout.addLayout(header)
+
+        self.status_label = QLabel("Computing statistics...")
+        self.layout.addWidget(self.status_label)
+
+    def set_stats(self, stats):
+        self.status_label.hide()
+        if self.numeric:
+            min_edit = QLineEdit(str(stats['min']))
+            max_edit = QLineEdit(str(stats['max']))
+            min_edit.textChanged.connect(self.changed)
+            max_edit.textChanged.connect(self.changed)
+
+            hbox = QHBoxLayout()
+            hbox.addWidget(QLabel("Min:"))
+            hbox.addWidget(min_edit)
+            hbox.addWidget(QLabel("Max:"))
+            hbox.addWidget(max_edit)
+
+            self.layout.addLayout(hbox)
+            self.control = (min_edit, max_edit)
+        else:
+            self.control = CategoryPicker(stats['values'])
+            self.control.selection_changed.connect(self.changed)
+            self.layout.addWidget(self.control)
+
+    def set_error(self, message):
+        self.status_label.setText(f"Failed to compute statistics: {message}")
+
+    def value(self):
+        """Current filter value, None if the control is not ready or invalid"""
+        if self.control is None:
+            return None
+        if self.numeric:
+            min_edit, max_edit = self.control
+            try:
+                min_val = float(min_edit.text()) if min_edit.text() else None
+                max_val = float(max_edit.text()) if max_edit.text() else None
+            except ValueError:
+                return None
+            return (min_val, max_val)
+        return self.control.value()
+
+
 class FilterWidget(QFrame):
+    """Searchable column list, a filter control is only created for columns the user adds"""
     filters_applied = pyqtSignal(dict)
 
     def __init__(self):
         super().__init__()
         self.setFrameShape(QFrame.Shape.StyledPanel)
+        self.data = None
+        self.filter_controls = {}
+        # Column statistics per data set, computed in the background
+        self._stats = {}
+        self._workers = {}
+        # Superseded workers are kept referenced until their thread is done
+        self._running_workers = set()
         self.init_ui()
 
     def init_ui(self):
         layout = QVBoxLayout(self)
         layout.addWidget(QLabel("Filter data"))
 
+        # Live mode re-applies filters shortly after the last edit
+        self.live_check = QCheckBox("Live filtering")
+        layout.addWidget(self.live_check)
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_FILTER_DELAY_MS)
+        self.live_timer.timeout.connect(self.on_apply_filters)
+
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Query, e.g. salary > 50000 and city in ['Berlin', 'Munich']")
+        self.query_edit.returnPressed.connect(self.on_apply_filters)
+        self.query_edit.textChanged.connect(self.on_filter_edited)
+        layout.addWidget(QLabel("Query:"))
+        layout.addWidget(self.query_edit)
+
+        self.column_search = QLineEdit()
+        self.column_search.setPlaceholderText("Search columns...")
+        layout.addWidget(self.column_search)
+
+        # Only visible rows of the list are rendered, even with thousands of columns
+        self.columns_model = QStringListModel()
+        self.columns_proxy = QSortFilterProxyModel()
+        self.columns_proxy.setSourceModel(self.columns_model)
+        self.columns_proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.column_search.textChanged.connect(self.columns_proxy.setFilterFixedString)
+
+        self.columns_list = QListView()
+        self.columns_list.setModel(self.columns_proxy)
+        self.columns_list.setUniformItemSizes(True)
+        self.columns_list.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.columns_list.setMaximumHeight(200)
+        self.columns_list.doubleClicked.connect(self.add_filter_from_index)
+        layout.addWidget(self.columns_list)
+
+        add_btn = QPushButton("Add filter")
+        add_btn.clicked.connect(lambda: self.add_filter_from_index(self.columns_list.currentIndex()))
+        layout.addWidget(add_btn)
+
         self.filter_controls_layout = QVBoxLayout()
         layout.addLayout(self.filter_controls_layout)
 
@@ -63,64 +260,106 @@ class FilterWidget(QFrame):
         layout.addWidget(apply_btn)
 
     def update_controls(self, data):
-        """Update filter controls based on data"""
-        self.filter_placeholder.hide()
-        for i in reversed(range(self.filter_controls_layout.count())):
-            widget = self.filter_controls_layout.itemAt(i).widget()
-            if widget:
-                widget.setParent(None)
-
-        self.filter_controls = {}
-
+        """Reset the column list and filters for new data"""
+        for column in list(self.filter_controls):
+            self.remove_filter(column)
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+        self._stats = {}
+
+        self.data = data
+        self.column_search.clear()
+        self.query_edit.clear()
         if data is None:
+            self.columns_model.setStringList([])
+            self.filter_placeholder.setText("Filters will appear here after loading data")
+            self.filter_placeholder.show()
             return
 
-        for column in data.columns:
-            label = QLabel(column)
-            self.filter_controls_layout.addWidget(label)
-
-            if pd.api.types.is_numeric_dtype(data[column]):
-                min_val = data[column].min()
-                max_val = data[column].max()
+        self.columns_model.setStringList([str(column) for column in data.columns])
+        self.filter_placeholder.setText("Double-click a column to add a filter")
+        self.filter_placeholder.show()
 
-                min_edit = QLineEdit(str(min_val))
-                max_edit = QLineEdit(str(max_val))
-
-                hbox = QHBoxLayout()
-                hbox.addWidget(QLabel("Min:"))
-                hbox.addWidget(min_edit)
-                hbox.addWidget(QLabel("Max:"))
-                hbox.addWidget(max_edit)
+    def add_filter_from_index(self, index):
+        if not index.isValid() or self.data is None:
+            return
+        position = self.columns_proxy.mapToSource(index).row()
+        self.add_filter(self.data.columns[position])
 
-                self.filter_controls_layout.addLayout(hbox)
-                self.filter_controls[column] = (min_edit, max_edit)
-            else:
-                unique_values = data[column].unique()
-                combo = NoScrollCBox()
-                combo.addItem("(All)")
-                combo.addItems(map(str, unique_values))
-                self.filter_controls_layout.addWidget(combo)
-                self.filter_controls[column] = combo
+    def add_filter(self, column):
+        """Create the filter control of a column and request its statistics"""
+        if column in self.filter_controls:
+            return
+        self.filter_placeholder.hide()
 
+        control = ColumnFilter(column, pd.api.types.is_numeric_dtype(self.data[column]))
+        control.remove_requested.connect(self.remove_filter)
+        control.changed.connect(self.on_filter_edited)
+        self.filter_controls_layout.addWidget(control)
+        self.filter_controls[column] = control
+
+        if column in self._stats:
+            control.set_stats(self._stats[column])
+        elif column not in self._workers:
+            self.start_stats_worker(column)
+
+    def start_stats_worker(self, column):
+        data = self.data
+        worker = Worker(compute_column_stats, data[column])
+        worker.signals.finished.connect(lambda stats: self.on_stats_ready(worker, data, column, stats))
+        worker.signals.failed.connect(lambda message: self.on_stats_failed(worker, data, column, message))
+        worker.signals.cancelled.connect(lambda: self._running_workers.discard(worker))
+        self._running_workers.add(worker)
+        self._workers[column] = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def on_stats_ready(self, worker, data, column, stats):
+        self._running_workers.discard(worker)
+        if data is not self.data:
+            return
+        self._workers.pop(column, None)
+        self._stats[column] = stats
+        if column in self.filter_controls:
+            self.filter_controls[column].set_stats(stats)
+
+    def on_stats_failed(self, worker, data, column, message):
+        self._running_workers.discard(worker)
+        if data is not self.data:
+            return
+        self._workers.pop(column, None)
+        if column in self.filter_controls:
+            self.filter_controls[column].set_error(message)
+
+    def is_live(self):
+        return self.live_check.isChecked()
+
+    def on_filter_edited(self):
+        """Restart the debounce timer, filters are applied once edits pause"""
+        if self.is_live():
+            self.live_timer.start()
+
+    def remove_filter(self, column):
+        control = self.filter_controls.pop(column, None)
+        if control is not None:
+            control.setParent(None)
+            control.deleteLater()
+            self.on_filter_edited()
+        if not self.filter_controls and self.data is not None:
+            self.filter_placeholder.show()
 
     def on_apply_filters(self):
         """Collect filter values and emit signal"""
-        if not hasattr(self, 'filter_controls'):
-            return
-
         filters = {}
 
         for column, control in self.filter_controls.items():
-            if isinstance(control, tuple):
-                min_edit, max_edit = control
-                try:
-                    min_val = float(min_edit.text()) if min_edit.text() else None
-                    max_val = float(max_edit.text()) if max_edit.text() else None
-                    filters[column] = (min_val, max_val)
-                except ValueError:
-                    pass
-            else:
-                filters[column] = control.currentText()
+            value = control.value()
+            if value is not None:
+                filters[column] = value
+
+        query = self.query_edit.text().strip()
+        if query:
+            filters[QUERY_KEY] = query
 
         self.filters_applied.emit(filters)
 
@@ -138,7 +377,7 @@ class PlotWidget(QFrame):
         layout = QVBoxLayout(self)
 
         self.plot_type_combo = QComboBox()
-        self.plot_type_combo.addItems(['bar', 'line', 'scatter', 'box', 'violin', 'hist', 'heatmap'])
+        self.plot_type_combo.addItems(['bar', 'line', 'scatter', 'box', 'violin', 'hist', 'kde', 'heatmap'])
         layout.addWidget(QLabel("Plot Type:"))
         layout.addWidget(self.plot_type_combo)
 
@@ -155,6 +394,45 @@ class PlotWidget(QFrame):
         layout.addWidget(QLabel("Hue (color by):"))
         layout.addWidget(self.hue_combo)
 
+        # Aggregated column of heatmaps, row counts when None
+        self.value_combo = QComboBox()
+        self.value_combo.addItem("None")
+        layout.addWidget(QLabel("Value (heatmap):"))
+        layout.addWidget(self.value_combo)
+
+        self.aggregation_combo = QComboBox()
+        self.aggregation_combo.addItems(["None"] + list(STAT_AGGREGATIONS))
+        layout.addWidget(QLabel("Aggregation:"))
+        layout.addWidget(self.aggregation_combo)
+
+        # Bar and line plots skip seaborn's bootstrapped confidence intervals
+        self.fast_check = QCheckBox("Fast bar/line plots (analytic error bars)")
+        self.fast_check.setChecked(True)
+        layout.addWidget(self.fast_check)
+
+        # Histogram bins and KDE bandwidth factor
+        self.bins_spin = QSpinBox()
+        self.bins_spin.setRange(1, HIST_MAX_BINS)
+        self.bins_spin.setValue(HIST_BINS)
+        layout.addWidget(QLabel("Histogram bins:"))
+        layout.addWidget(self.bins_spin)
+
+        self.bw_adjust_spin = QDoubleSpinBox()
+        self.bw_adjust_spin.setRange(0.05, 10.0)
+        self.bw_adjust_spin.setSingleStep(0.1)
+        self.bw_adjust_spin.setValue(1.0)
+        layout.addWidget(QLabel("KDE bandwidth adjust:"))
+        layout.addWidget(self.bw_adjust_spin)
+
+        # Larger line and scatter plots are decimated or binned
+        self.point_budget_spin = QSpinBox()
+        self.point_budget_spin.setRange(1_000, 100_000_000)
+        self.point_budget_spin.setSingleStep(10_000)
+        self.point_budget_spin.setValue(POINT_BUDGET)
+        self.point_budget_spin.setGroupSeparatorShown(True)
+        layout.addWidget(QLabel("Point budget:"))
+        layout.addWidget(self.point_budget_spin)
+
         plot_btn = QPushButton("Generate Plot")
         plot_btn.clicked.connect(self.on_plot_requested)
         layout.addWidget(plot_btn)
@@ -164,16 +442,20 @@ class PlotWidget(QFrame):
         self.x_axis_combo.clear()
         self.y_axis_combo.clear()
         self.hue_combo.clear()
+        self.value_combo.clear()
 
         self.x_axis_combo.addItem("None")
         self.y_axis_combo.addItem("None")
         self.hue_combo.addItem("None")
+        self.value_combo.addItem("None")
 
         if data is not None:
             for column in data.columns:
                 self.x_axis_combo.addItem(column)
                 self.y_axis_combo.addItem(column)
                 self.hue_combo.addItem(column)
+            for column in data.select_dtypes('number').columns:
+                self.value_combo.addItem(column)
 
     def on_plot_requested(self):
         """Emit signal with plot parameters"""
@@ -181,16 +463,14 @@ class PlotWidget(QFrame):
             'plttype': self.plot_type_combo.currentText(),
             'x': self.x_axis_combo.currentText() if self.x_axis_combo.currentText() != "None" else None,
             'y': self.y_axis_combo.currentText() if self.y_axis_combo.currentText() != "None" else None,
-            'hue': self.hue_combo.currentText() if self.hue_combo.currentText() != "None" else None
+            'hue': self.hue_combo.currentText() if self.hue_combo.currentText() != "None" else None,
+            'value': self.value_combo.currentText() if self.value_combo.currentText() != "None" else None,
+            'aggregation': self.aggregation_combo.currentText()
+            if self.aggregation_combo.currentText() != "None" else None,
+            'fast': self.fast_check.isChecked(),
+            'bins': self.bins_spin.value(),
+            'bw_adjust': self.bw_adjust_spin.value(),
+            'point_budget': self.point_budget_spin.value()
         }
         self.plot_requested.emit(plot_params)
 
-
-class NoScrollCBox(QComboBox):
-    """disable changing ComboBox options using scroll"""
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
-
-    def wheelEvent(self, event):
-        event.ignore()
\ No newline at end of file
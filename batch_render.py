@@ -0,0 +1,150 @@
+"""Render a list of plots without the GUI.
+
+    python batch_render.py data.csv plots.json --output-dir charts --format svg
+
+The spec file is a JSON (or YAML, when PyYAML is installed) list of
+PlotGenerator.generate parameter sets, optionally wrapped as {"plots": [...]}.
+An entry may set "name" (output file name) and "format".
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from pyarrow import feather
+
+from app.tools.data_loader import load_file
+from app.tools.plot_generator import PlotGenerator
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+FORMATS = ('png', 'svg', 'pdf')
+ARROW_SUFFIXES = ('.feather', '.arrow')
+
+# Data set of a worker process, memory-mapped once by init_worker
+_data = None
+
+
+class SilentProgress:
+    """Stands in for a Worker when data is loaded outside the GUI"""
+    def check_cancelled(self):
+        pass
+
+    def report(self, value):
+        pass
+
+
+def load_spec(path) -> list:
+    with open(path, encoding='utf-8') as handle:
+        if path.endswith(('.yml', '.yaml')):
+            if yaml is None:
+                raise SystemExit("Reading YAML specs requires PyYAML (pip install pyyaml)")
+            spec = yaml.safe_load(handle)
+        else:
+            spec = json.load(handle)
+    if isinstance(spec, dict):
+        spec = spec.get('plots', [])
+    if not isinstance(spec, list) or not all(isinstance(entry, dict) for entry in spec):
+        raise SystemExit(f"{path}: expected a list of plot parameter objects")
+    return spec
+
+
+def output_name(index, params) -> str:
+    name = params.pop('name', None) or f"{index:03d}_{params.get('plttype', 'bar')}"
+    return re.sub(r'[^\w.-]+', '_', str(name))
+
+
+def init_worker(arrow_path):
+    """Map the shared Arrow file, numeric columns are used without copying"""
+    global _data
+    _data = feather.read_table(arrow_path, memory_map=True).to_pandas(split_blocks=True)
+
+
+def render(task):
+    """Render one plot in a worker process, returns (name, path, error)"""
+    name, params, path, dpi = task
+    try:
+        columns = PlotGenerator.columns_used(**params)
+        data = _data if columns is None else _data[columns]
+        figure = PlotGenerator.generate(data=data, raise_errors=True, **params)
+        figure.savefig(path, dpi=dpi)
+        return name, path, None
+    except Exception as e:
+        return name, None, f"{type(e).__name__}: {e}"
+    finally:
+        # Facet grids are created through pyplot, close them so workers do not keep every figure
+        plt.close('all')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render plots from a plot-spec file without the GUI")
+    parser.add_argument('dataset', help="CSV, Excel or Feather/Arrow file")
+    parser.add_argument('spec', help="JSON or YAML list of PlotGenerator.generate parameters")
+    parser.add_argument('-o', '--output-dir', default='plots')
+    parser.add_argument('-f', '--format', choices=FORMATS, default='png',
+                        help="default output format of entries without their own")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--engine', choices=('pandas', 'pyarrow'), default='pyarrow',
+                        help="CSV parser used to load the data set")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    spec = load_spec(args.spec)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    tasks = []
+    for index, params in enumerate(spec):
+        params = dict(params)
+        name = output_name(index, params)
+        file_format = params.pop('format', args.format)
+        if file_format not in FORMATS:
+            raise SystemExit(f"{name}: unknown format {file_format!r}")
+        tasks.append((name, params, os.path.join(args.output_dir, f"{name}.{file_format}"), args.dpi))
+
+    start = time.perf_counter()
+    temp_path = None
+    if args.dataset.endswith(ARROW_SUFFIXES):
+        arrow_path = args.dataset
+    else:
+        # Loaded once, then shared with the workers as an uncompressed Arrow IPC file
+        data = load_file(SilentProgress(), args.dataset, {'engine': args.engine})
+        handle, temp_path = tempfile.mkstemp(suffix='.feather')
+        os.close(handle)
+        feather.write_feather(data, temp_path, compression='uncompressed')
+        arrow_path = temp_path
+        print(f"Loaded {len(data):,} rows in {time.perf_counter() - start:.1f}s")
+        del data
+
+    failed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=init_worker,
+                                 initargs=(arrow_path,)) as pool:
+            for name, path, error in pool.map(render, tasks):
+                if error:
+                    failed += 1
+                    print(f"FAILED {name}: {error}", file=sys.stderr)
+                else:
+                    print(f"wrote {path}")
+    finally:
+        if temp_path is not None:
+            os.remove(temp_path)
+
+    print(f"Rendered {len(tasks) - failed} of {len(tasks)} plots in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
 import sys
+import matplotlib
+# Plots are built off the GUI thread, pyplot must never open windows itself
+matplotlib.use('Agg')
 from PyQt6.QtWidgets import QApplication
 from app.main_window import MainWindow
 